@@ -0,0 +1,87 @@
+"""Page weight and load time with and without the request policy.
+
+Loads fixture course pages that pull images, a font, a video, a first-party
+script and a tracker script (served from a second host name), once through
+a pool without request blocking and once through a pool using the same
+policy settings as main.py. Bytes are counted by the fixture server.
+
+Run from the repository root:  python -m benchmarks.bench_blocking --pages 10 --assets 20
+"""
+import argparse
+import asyncio
+import time
+
+from browser_pool import BrowserPool
+from request_policy import DEFAULT_BLOCKED_TYPES, DEFAULT_TRACKER_HOSTS, RequestPolicy
+from benchmarks.fixture_site import start_fixture_server
+
+
+async def load_pages(pool: BrowserPool, server, url: str, pages: int) -> list:
+    """Load `url` `pages` times, returning (seconds, bytes, requests) for each load"""
+    samples = []
+    for _ in range(pages):
+        async with pool.page() as page:
+            bytes_before, requests_before = server.bytes_sent, server.requests_served
+            started = time.perf_counter()
+            await page.goto(url, wait_until="load", timeout=60000)
+            elapsed = time.perf_counter() - started
+            # Let late requests (the video, the tracker) reach the server
+            await page.wait_for_timeout(200)
+            samples.append((
+                elapsed,
+                server.bytes_sent - bytes_before,
+                server.requests_served - requests_before,
+            ))
+    return samples
+
+
+def report(label: str, samples: list, policy: RequestPolicy = None):
+    count = len(samples)
+    seconds = sum(s[0] for s in samples) / count
+    kib = sum(s[1] for s in samples) / count / 1024
+    requests = sum(s[2] for s in samples) / count
+    print(f"{label:9} {seconds * 1000:8.1f} ms/page  {kib:9.1f} KiB/page  {requests:5.1f} requests/page")
+    if policy:
+        print("          blocked per page: " + ", ".join(
+            f"{reason} {n / count:.1f}" for reason, n in sorted(policy.blocked.items())
+        ))
+
+
+async def bench(pages: int, assets: int, latency: float, script_hosts):
+    server, base_url = start_fixture_server(latency=latency, assets=assets)
+    url = f"{base_url}/university/fixture-college-20/courses-fees"
+    # The fixture's tracker is served from "localhost" rather than a real ad host
+    policy = RequestPolicy(
+        blocked_types=DEFAULT_BLOCKED_TYPES,
+        tracker_hosts=DEFAULT_TRACKER_HOSTS + ("localhost",),
+        script_hosts=script_hosts,
+    )
+    try:
+        for label, pool_policy in (("open", None), ("blocking", policy)):
+            pool = BrowserPool(size=1, max_pages=1, request_policy=pool_policy)
+            await pool.start()
+            try:
+                # One warm-up load so browser start-up is not counted
+                await load_pages(pool, server, url, 1)
+                if pool_policy:
+                    pool_policy.blocked.clear()
+                report(label, await load_pages(pool, server, url, pages), pool_policy)
+            finally:
+                await pool.stop()
+    finally:
+        server.shutdown()
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--assets", type=int, default=20, help="images per page")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every response")
+    parser.add_argument("--script-hosts", help="comma-separated script allow-list, e.g. 127.0.0.1")
+    args = parser.parse_args()
+    script_hosts = args.script_hosts.split(",") if args.script_hosts else None
+    asyncio.run(bench(args.pages, args.assets, args.latency, script_hosts))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,116 @@
+"""Fee table extraction micro-benchmark over saved course pages.
+
+Compares, per page:
+  legacy    BeautifulSoup html.parser over the whole page, three cleanup regexes per cell
+  subtree   extract.fee_tables_in_html, which parses only the fee table markup
+  browser   the Python side of READ_TABLES_JS: cleaning the {header, rows} it returns
+
+Pages are generated from the fixture site unless saved HTML files are given.
+
+Run from the repository root:  python -m benchmarks.bench_extract --courses 40 --filler-kb 400
+"""
+import argparse
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+import main
+from extract import fee_tables_in_html, tables_to_rows
+from benchmarks.fixture_site import render_expanded_page
+
+
+def legacy_clean(text: str) -> str:
+    if not text:
+        return text
+    text = re.sub(r'\s*check\s+details?\s*', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\s*view\s+details?\s*', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\s*see\s+details?\s*', '', text, flags=re.IGNORECASE)
+    text = ' '.join(text.split())
+    return text.strip()
+
+
+def legacy_parse(html: str, name: str) -> list:
+    """The full-page parse scrape_table used before targeted extraction"""
+    soup = BeautifulSoup(html, 'html.parser')
+    data_list = []
+    for table in soup.find_all('table', class_=main.FEE_TABLE_CLASS):
+        header = [th.text.strip() for th in table.find('tr').find_all('th')]
+        data = []
+        for row in table.find_all('tr')[1:]:
+            cells = row.find_all('td')
+            if not cells:
+                continue
+            data.append(dict(zip(header, [legacy_clean(cell.text.strip()) for cell in cells])))
+        data_list.append({name: data})
+    return data_list
+
+
+def subtree_parse(html: str, name: str) -> list:
+    return tables_to_rows(fee_tables_in_html(html, main.FEE_TABLE_CLASS), name)
+
+
+def time_per_call(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def bench_page(label: str, html: str, repeat: int):
+    name = "Course"
+    # What READ_TABLES_JS hands back from the browser for the same page
+    extracted = fee_tables_in_html(html, main.FEE_TABLE_CLASS)
+
+    expected = legacy_parse(html, name)
+    for variant, got in (("subtree", subtree_parse(html, name)), ("browser", tables_to_rows(extracted, name))):
+        if got != expected:
+            raise SystemExit(f"{label}: {variant} extraction differs from the legacy parse")
+
+    rows = sum(len(rows) for table in expected for rows in table.values())
+    print(f"{label}: {len(html) / 1024:.0f} KiB, {len(expected)} tables, {rows} rows")
+    timings = {
+        "legacy": time_per_call(lambda: legacy_parse(html, name), repeat),
+        "subtree": time_per_call(lambda: subtree_parse(html, name), repeat),
+        "browser": time_per_call(lambda: tables_to_rows(extracted, name), repeat),
+    }
+    legacy = timings["legacy"]
+    for variant, seconds in timings.items():
+        print(f"  {variant:8} {seconds * 1000:9.3f} ms/page  {1 / seconds:9.0f} pages/s  "
+              f"{legacy / seconds:6.1f}x")
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("html", nargs="*", help="saved page.content() files to benchmark")
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--tables-per-course", type=int, default=2)
+    parser.add_argument("--filler-kb", type=int, default=400, help="unrelated markup per generated page")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--save", metavar="DIR", help="write the generated pages to DIR")
+    args = parser.parse_args()
+
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, encoding="utf-8") as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [
+            (f"fixture-{courses}-courses",
+             render_expanded_page("fixture-college", courses, args.tables_per_course, args.filler_kb))
+            for courses in (1, args.courses)
+        ]
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            for label, html in pages:
+                with open(os.path.join(args.save, label + ".html"), "w", encoding="utf-8") as f:
+                    f.write(html)
+
+    for label, html in pages:
+        bench_page(label, html, args.repeat)
+
+
+if __name__ == "__main__":
+    cli()
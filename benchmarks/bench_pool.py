@@ -0,0 +1,96 @@
+"""Cold-launch vs pooled browser benchmark against the local fixture site.
+
+Cold mode launches a fresh Chromium for the course count and for every
+course, like the original /scrape handler. Pooled mode leases pages from a
+BrowserPool started once.
+
+Run from the repository root:  python -m benchmarks.bench_pool --courses 20
+"""
+import argparse
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+import main
+from browser_pool import BrowserPool
+from ratelimit import HostRateLimiter
+from benchmarks.fixture_site import start_fixture_server
+
+
+class ColdPool:
+    """Pool look-alike that launches a new browser for every page"""
+
+    def __init__(self, max_pages: int):
+        self._slots = asyncio.Semaphore(max_pages)
+        self.launches = 0
+
+    @asynccontextmanager
+    async def page(self):
+        async with self._slots:
+            playwright = await async_playwright().start()
+            try:
+                browser = await playwright.chromium.launch(headless=True)
+                self.launches += 1
+                try:
+                    context = await browser.new_context()
+                    yield await context.new_page()
+                finally:
+                    await browser.close()
+            finally:
+                await playwright.stop()
+
+
+async def run_once(pool, url: str) -> dict:
+    started = time.perf_counter()
+    total = await main.get_total_courses(url, pool=pool)
+    results = await asyncio.gather(
+        *(main.scrape_single_course(i, url, pool=pool) for i in range(total))
+    )
+    elapsed = time.perf_counter() - started
+    tables = sum(len(tables) for tables, _ in results)
+    return {"courses": total, "tables": tables, "seconds": elapsed}
+
+
+async def bench(courses: int, concurrency: int, rounds: int):
+    server, base_url = start_fixture_server()
+    url = f"{base_url}/university/fixture-college-{courses}/courses-fees"
+    try:
+        cold = ColdPool(concurrency)
+        for r in range(rounds):
+            stats = await run_once(cold, url)
+            print(f"cold   round {r + 1}: {stats['courses']} courses, {stats['tables']} tables "
+                  f"in {stats['seconds']:.2f}s ({cold.launches} launches so far)")
+
+        pool = BrowserPool(size=2, max_pages=concurrency)
+        started = time.perf_counter()
+        await pool.start()
+        print(f"pool start: {time.perf_counter() - started:.2f}s")
+        try:
+            for r in range(rounds):
+                stats = await run_once(pool, url)
+                print(f"pooled round {r + 1}: {stats['courses']} courses, {stats['tables']} tables "
+                      f"in {stats['seconds']:.2f}s ({pool.launches} launches so far)")
+        finally:
+            await pool.stop()
+    finally:
+        server.shutdown()
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--host-rate", type=float, default=1000, help="HOST_RATE_LIMIT for the fixture host")
+    parser.add_argument("--host-burst", type=int, help="HOST_RATE_BURST for the fixture host (default: the rate, rounded up)")
+    args = parser.parse_args()
+    # The app's default per-host limit would throttle both modes alike and hide the launch cost
+    main.host_limiter = HostRateLimiter(args.host_rate, args.host_burst or max(1, math.ceil(args.host_rate)))
+    asyncio.run(bench(args.courses, args.concurrency, args.rounds))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,234 @@
+"""End-to-end /scrape benchmark against the local fixture site.
+
+Starts the fixture site and the app (uvicorn, in this process) with the
+app's college catalog pointing at fixture colleges, then sends GET /scrape
+requests over HTTP at each concurrency level. Every request asks for a
+different college and the result cache is disabled, so every request
+scrapes. For each level it reports request latency (p50/p99), courses-fees
+page loads per second, peak RSS of this process and its Chromium children,
+and the peak number of Chromium processes.
+
+RSS and process counts are read from /proc, so they are only reported on Linux.
+
+Run from the repository root:  python -m benchmarks.bench_scrape --courses 10 --concurrency 1,2,4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.fixture_site import start_fixture_server
+
+
+def percentile(values: list, p: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def process_tree(root: int) -> list:
+    """(pid, command name, RSS bytes) for `root` and all of its descendants, from /proc"""
+    children, info = {}, {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name is in parentheses and may itself contain spaces
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2:].split()
+        pid, ppid, rss_pages = int(entry), int(fields[1]), int(fields[21])
+        children.setdefault(ppid, []).append(pid)
+        info[pid] = (name, rss_pages * page_size)
+
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        if pid in info:
+            tree.append((pid,) + info[pid])
+        stack.extend(children.get(pid, ()))
+    return tree
+
+
+class ResourceSampler:
+    """Samples the RSS and Chromium process count of this process tree in a thread"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.available = os.path.isdir("/proc")
+        self.peak_rss = 0
+        self.peak_chromium = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        tree = process_tree(os.getpid())
+        self.peak_rss = max(self.peak_rss, sum(rss for _, _, rss in tree))
+        self.peak_chromium = max(
+            self.peak_chromium, sum(1 for _, name, _ in tree if "chrom" in name.lower() or "headless" in name)
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        if self.available:
+            self.sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self.sample()
+
+
+def fetch(url: str) -> tuple:
+    """GET a URL, returning (seconds, status, body bytes)"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=600) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        body, status = e.read(), e.code
+    return time.perf_counter() - started, status, len(body)
+
+
+async def run_level(app_url: str, colleges: list, concurrency: int, mode: str, server) -> dict:
+    """Send one /scrape per college, `concurrency` at a time"""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(college):
+        query = urllib.parse.urlencode({"college": college, "mode": mode})
+        async with slots:
+            return await asyncio.to_thread(fetch, f"{app_url}/scrape?{query}")
+
+    pages_before = server.requests_served
+    with ResourceSampler() as sampler:
+        started = time.perf_counter()
+        samples = await asyncio.gather(*(one(college) for college in colleges))
+        elapsed = time.perf_counter() - started
+    latencies = [seconds for seconds, _, _ in samples]
+    pages = server.requests_served - pages_before
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "failed": sum(1 for _, status, _ in samples if status != 200),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "seconds": elapsed,
+        "pages": pages,
+        "pages_per_second": pages / elapsed,
+        "peak_rss_mb": sampler.peak_rss / 2 ** 20 if sampler.available else None,
+        "peak_chromium": sampler.peak_chromium if sampler.available else None,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def report(row: dict):
+    rss = f"{row['peak_rss_mb']:8.0f} MiB" if row["peak_rss_mb"] is not None else "     n/a    "
+    chromium = f"{row['peak_chromium']:4d}" if row["peak_chromium"] is not None else " n/a"
+    print(f"{row['concurrency']:11d} {row['requests']:8d} {row['failed']:6d} {row['p50']:8.2f}s {row['p99']:8.2f}s "
+          f"{row['pages_per_second']:9.1f} {rss} {chromium}")
+
+
+async def bench(args):
+    fixture, fixture_url = start_fixture_server(
+        latency=args.latency, tables_per_course=args.tables_per_course,
+        render_delay_ms=args.render_delay_ms, replay_dir=args.replay_dir,
+    )
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    # One fixture college per request, so requests neither share a scrape nor hit the cache
+    total = sum(level * args.rounds for level in levels)
+    catalog = {f"Fixture College {i}": f"/university/fixture-college-{i}-{args.courses}" for i in range(total)}
+    workdir = tempfile.mkdtemp(prefix="bench_scrape_")
+    catalog_path = os.path.join(workdir, "college_links.json")
+    with open(catalog_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    os.environ.update({
+        "COLLEGEDUNIA_BASE_URL": fixture_url,
+        "COLLEGE_LINKS_PATH": catalog_path,
+        "RESULT_CACHE_TTL": "0",
+        "RESULT_CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "HOST_RATE_LIMIT": str(args.host_rate),
+        "HOST_RATE_BURST": str(args.host_burst or max(1, math.ceil(args.host_rate))),
+    })
+    # main reads its settings when it is imported
+    import main
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            raise SystemExit("The app failed to start")
+        await asyncio.sleep(0.05)
+    app_url = f"http://127.0.0.1:{port}"
+
+    names = iter(catalog)
+    rows = []
+    print(f"{args.courses} courses per college, {args.latency * 1000:g} ms latency, mode={args.mode}")
+    print("concurrency requests failed      p50      p99   pages/s    peak RSS  chromium")
+    try:
+        for level in levels:
+            colleges = [next(names) for _ in range(level * args.rounds)]
+            # The app logs every course; keep the table readable unless asked
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                row = await run_level(app_url, colleges, level, args.mode, fixture)
+            rows.append(row)
+            report(row)
+    finally:
+        server.should_exit = True
+        await serving
+        fixture.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=10, help="courses per fixture college")
+    parser.add_argument("--concurrency", default="1,2,4", help="comma-separated numbers of requests in flight")
+    parser.add_argument("--rounds", type=int, default=2, help="requests per level, as a multiple of the level")
+    parser.add_argument("--mode", default="single_page", choices=("single_page", "per_course"))
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fixture response")
+    parser.add_argument("--tables-per-course", type=int, default=2)
+    parser.add_argument("--render-delay-ms", type=int, default=150)
+    parser.add_argument("--replay-dir", help="serve recorded pages from <dir>/<slug>.html")
+    parser.add_argument("--host-rate", type=float, default=1000, help="HOST_RATE_LIMIT for the fixture host")
+    parser.add_argument("--host-burst", type=int, help="HOST_RATE_BURST for the fixture host (default: the rate, rounded up)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the app's log output")
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
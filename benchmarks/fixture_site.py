@@ -0,0 +1,271 @@
+"""Local stand-in for collegedunia /courses-fees pages.
+
+Serves /university/<slug>-<courses>/courses-fees (or /college/...) with the
+same toggle spans, course blocks and fee table classes that main.py looks
+for. Clicking a toggle renders that course's fee tables after a short
+client-side delay, like the live site does. With `replay_dir`, a recorded
+page saved as <replay_dir>/<slug>.html is served instead of a generated one. With `assets`, pages also pull images, a font, a video, a
+first-party script and a tracker script from a second host name (localhost),
+so request blocking can be measured; the server counts the bytes it sends.
+
+Run standalone:  python -m benchmarks.fixture_site --port 8800
+"""
+import argparse
+import html
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_COURSES = 10
+PATH_RE = re.compile(r"^/(?:university|college)/(?P<slug>[\w-]*?)(?:-(?P<courses>\d+))?/courses-fees/?$")
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>{title} Courses &amp; Fees</title>{head_assets}</head>
+<body>
+<h1>{title}</h1>
+{body_assets}
+{blocks}
+<script>
+const FEES = {fees};
+document.querySelectorAll("span.arrow-d-blue-20").forEach(function (btn, i) {{
+    btn.addEventListener("click", function () {{
+        setTimeout(function () {{
+            document.getElementById("fees-" + i).innerHTML = FEES[i];
+        }}, {render_delay_ms});
+    }});
+}});
+</script>
+</body>
+</html>
+"""
+
+BLOCK_TEMPLATE = """<div class="course-card">
+<div class="jsx-3955509628 course-detail d-flex justify-content-between">
+<a href="#course-{index}">{name}</a>
+<span class="jsx-3955509628 icon icon-20 clg-sprite arrow-d-blue-20 mr-1 "></span>
+</div>
+<div class="course-fees" id="fees-{index}"></div>
+</div>"""
+
+TABLE_TEMPLATE = """<table class="jsx-2530098677 table-new table-responsive">
+<tr><th>Year</th><th>Tuition Fees</th><th>Hostel Fees</th></tr>
+{rows}
+</table>"""
+
+
+def course_name(index: int) -> str:
+    return f"B.Tech Specialisation {index + 1}"
+
+
+def fee_table(index: int, table: int) -> str:
+    rows = []
+    for year in range(1, 5):
+        tuition = 100000 + index * 1000 + table * 100 + year
+        rows.append(
+            f"<tr><td>Year {year}</td><td>&#8377; {tuition:,} check details</td>"
+            f"<td>&#8377; {tuition // 2:,}</td></tr>"
+        )
+    return TABLE_TEMPLATE.format(rows="\n".join(rows))
+
+
+# Sizes of the fake assets, roughly those of the live pages
+ASSET_SIZES = {
+    "image": 40 * 1024,
+    "font": 60 * 1024,
+    "media": 200 * 1024,
+    "script": 20 * 1024,
+    "tracker": 30 * 1024,
+}
+ASSET_RE = re.compile(r"^/(?P<kind>static|tracker)/(?P<name>[\w.-]+)$")
+ASSET_TYPES = {".jpg": "image/jpeg", ".woff2": "font/woff2", ".mp4": "video/mp4",
+               ".js": "application/javascript", ".css": "text/css"}
+
+
+def asset_markup(assets: int, port: int):
+    """(head, body) markup pulling `assets` images plus one of each other asset kind"""
+    if not assets:
+        return "", ""
+    head = '<link rel="stylesheet" href="/static/site.css">'
+    body = "\n".join(
+        [f'<img src="/static/img-{i}.jpg" width="40" height="40">' for i in range(assets)]
+        + ['<video src="/static/intro.mp4" preload="auto" muted></video>',
+           '<script src="/static/app.js"></script>',
+           f'<script src="http://localhost:{port}/tracker/analytics.js"></script>']
+    )
+    return head, body
+
+
+def asset_body(kind: str, name: str) -> bytes:
+    if name.endswith(".css"):
+        return b"@font-face{font-family:F;src:url(/static/site.woff2)}body{font-family:F}"
+    if name.endswith(".js"):
+        size = ASSET_SIZES["tracker" if kind == "tracker" else "script"]
+        return (b"/* fixture */" + b" " * size)[:size]
+    kind = {".jpg": "image", ".woff2": "font", ".mp4": "media"}[name[name.rindex("."):]]
+    return b"\0" * ASSET_SIZES[kind]
+
+
+def render_page(slug: str, courses: int, tables_per_course: int = 2, render_delay_ms: int = 150,
+                assets: int = 0, port: int = 0) -> str:
+    title = html.escape(slug.replace("-", " ").title() or "Fixture College")
+    blocks = "\n".join(
+        BLOCK_TEMPLATE.format(index=i, name=html.escape(course_name(i)))
+        for i in range(courses)
+    )
+    fees = [
+        "".join(fee_table(i, t) for t in range(tables_per_course))
+        for i in range(courses)
+    ]
+    # Escape for embedding as JS string literals
+    fees_js = "[" + ",".join(
+        '"' + f.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "") + '"'
+        for f in fees
+    ) + "]"
+    head_assets, body_assets = asset_markup(assets, port)
+    return PAGE_TEMPLATE.format(
+        title=title,
+        head_assets=head_assets,
+        body_assets=body_assets,
+        blocks=blocks,
+        fees=fees_js,
+        render_delay_ms=render_delay_ms,
+    )
+
+
+FILLER_BLOCK = """<div class="review-card"><div class="review-head"><span class="name">Student {index}</span>
+<span class="rating">4.{digit}</span></div><p class="review-body">Placements, hostel and faculty were reviewed
+here; the campus has labs, a library and sports facilities. Fees are paid per semester.</p></div>"""
+
+
+def render_expanded_page(slug: str, courses: int, tables_per_course: int = 2, filler_kb: int = 0) -> str:
+    """HTML of a page with every course expanded, as page.content() returns it.
+
+    `filler_kb` adds roughly that much unrelated markup, since the live pages
+    carry far more navigation, reviews and ads than fee tables.
+    """
+    title = html.escape(slug.replace("-", " ").title() or "Fixture College")
+    blocks = "\n".join(
+        BLOCK_TEMPLATE.format(index=i, name=html.escape(course_name(i))).replace(
+            f'id="fees-{i}"></div>',
+            f'id="fees-{i}">' + "".join(fee_table(i, t) for t in range(tables_per_course)) + "</div>",
+        )
+        for i in range(courses)
+    )
+    filler = []
+    size = 0
+    while size < filler_kb * 1024:
+        filler.append(FILLER_BLOCK.format(index=len(filler), digit=len(filler) % 10))
+        size += len(filler[-1])
+    return (
+        f"<!DOCTYPE html>\n<html><head><title>{title} Courses &amp; Fees</title></head>\n<body>\n"
+        f"<h1>{title}</h1>\n{blocks}\n{''.join(filler)}\n</body></html>\n"
+    )
+
+
+def recorded_page(replay_dir: str, path: str):
+    """The saved page for a /courses-fees path, or None if there is no recording of it"""
+    slug = path.strip("/").split("/")[1]
+    file_path = os.path.join(replay_dir, slug + ".html")
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def make_handler(latency: float = 0.0, tables_per_course: int = 2, render_delay_ms: int = 150,
+                 assets: int = 0, replay_dir: str = None):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            path = self.path.split("?", 1)[0]
+            asset = ASSET_RE.match(path)
+            if asset:
+                name = asset.group("name")
+                extension = name[name.rfind("."):]
+                if extension not in ASSET_TYPES:
+                    self.send_error(404)
+                    return
+                self.send_body(asset_body(asset.group("kind"), name), ASSET_TYPES[extension])
+                return
+            match = PATH_RE.match(path)
+            if not match:
+                self.send_error(404)
+                return
+            recorded = recorded_page(replay_dir, path) if replay_dir else None
+            if recorded is not None:
+                self.send_body(recorded, "text/html; charset=utf-8")
+                return
+            courses = int(match.group("courses") or DEFAULT_COURSES)
+            body = render_page(
+                match.group("slug"),
+                courses,
+                tables_per_course=tables_per_course,
+                render_delay_ms=render_delay_ms,
+                assets=assets,
+                port=self.server.server_address[1],
+            ).encode("utf-8")
+            self.send_body(body, "text/html; charset=utf-8")
+
+        def send_body(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            # Every load fetches its assets again, so byte counts are per page
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+            with self.server.stats_lock:
+                self.server.requests_served += 1
+                self.server.bytes_sent += len(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def start_fixture_server(port: int = 0, latency: float = 0.0, tables_per_course: int = 2,
+                         render_delay_ms: int = 150, assets: int = 0, replay_dir: str = None):
+    """Start the fixture site in a daemon thread and return (server, base_url).
+
+    server.requests_served and server.bytes_sent count the response bodies sent.
+    """
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port),
+        make_handler(latency, tables_per_course, render_delay_ms, assets, replay_dir),
+    )
+    server.stats_lock = threading.Lock()
+    server.requests_served = 0
+    server.bytes_sent = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--tables-per-course", type=int, default=2)
+    parser.add_argument("--render-delay-ms", type=int, default=150)
+    parser.add_argument("--assets", type=int, default=0, help="images per page, plus font, video and scripts")
+    parser.add_argument("--replay-dir", help="serve <dir>/<slug>.html for recorded colleges")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server(
+        args.port, args.latency, args.tables_per_course, args.render_delay_ms, args.assets, args.replay_dir
+    )
+    print(f"Fixture site on {base_url}/university/fixture-college-{DEFAULT_COURSES}/courses-fees")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
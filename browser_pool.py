@@ -0,0 +1,171 @@
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from typing import Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+
+class PooledBrowser:
+    """A long-lived browser and the context its pages are opened in"""
+
+    def __init__(self, browser, context):
+        self.browser = browser
+        self.context = context
+        self.uses = 0
+        self.active = 0
+        self.retiring = False
+
+    def is_healthy(self) -> bool:
+        return not self.retiring and self.browser.is_connected()
+
+
+class BrowserPool:
+    """Pool of Chromium browsers that hands out pages to scraping handlers.
+
+    The pool is started and stopped with the application lifespan. At most
+    `max_pages` pages are open at once across all browsers, and a browser is
+    recycled (closed and relaunched) after it has served `max_uses` pages.
+    Every context is routed through `request_policy` when one is given, and
+    browser launches are timed as "launch" spans of `telemetry`.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_pages: int = 5,
+        max_uses: int = 50,
+        headless: bool = True,
+        context_options: Optional[Dict] = None,
+        request_policy=None,
+        telemetry=None,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self.context_options = context_options or {}
+        self.request_policy = request_policy
+        self.telemetry = telemetry
+
+        self._playwright = None
+        self._browsers: List[PooledBrowser] = []
+        self._page_slots: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+        # Exported on /metrics
+        self.launches = 0
+        self.recycles = 0
+        self.pages_served = 0
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self):
+        if self.started:
+            return
+        self._playwright = await async_playwright().start()
+        self._page_slots = asyncio.Semaphore(self.max_pages)
+        self._lock = asyncio.Lock()
+        for _ in range(self.size):
+            self._browsers.append(await self._launch())
+        print(f"Browser pool started: {self.size} browsers, {self.max_pages} pages max")
+
+    async def stop(self):
+        if not self.started:
+            return
+        for pooled in self._browsers:
+            await self._close(pooled)
+        self._browsers = []
+        try:
+            await self._playwright.stop()
+        except Exception as e:
+            print("Playwright stop error:", e)
+        self._playwright = None
+        print("Browser pool stopped")
+
+    async def _launch(self) -> PooledBrowser:
+        with self.telemetry.span("launch") if self.telemetry else nullcontext():
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+            context = await browser.new_context(**self.context_options)
+            if self.request_policy:
+                await self.request_policy.install(context)
+        self.launches += 1
+        return PooledBrowser(browser, context)
+
+    async def _close(self, pooled: PooledBrowser):
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    async def _acquire_browser(self) -> PooledBrowser:
+        async with self._lock:
+            # Health check: drop browsers that crashed or were disconnected
+            for pooled in list(self._browsers):
+                if not pooled.browser.is_connected():
+                    print("Pooled browser disconnected, replacing it")
+                    self._browsers.remove(pooled)
+                    await self._close(pooled)
+
+            healthy = [b for b in self._browsers if b.is_healthy()]
+            while len(healthy) < self.size:
+                pooled = await self._launch()
+                self._browsers.append(pooled)
+                healthy.append(pooled)
+
+            # Least busy browser first
+            pooled = min(healthy, key=lambda b: b.active)
+            pooled.active += 1
+            pooled.uses += 1
+            if pooled.uses >= self.max_uses:
+                pooled.retiring = True
+            return pooled
+
+    async def _release_browser(self, pooled: PooledBrowser):
+        async with self._lock:
+            pooled.active -= 1
+            if pooled.retiring and pooled.active == 0 and pooled in self._browsers:
+                self._browsers.remove(pooled)
+                await self._close(pooled)
+                self.recycles += 1
+
+    @asynccontextmanager
+    async def page(self):
+        """Lease a page from the pool; it is closed when the block exits"""
+        if not self.started:
+            raise RuntimeError("Browser pool is not started")
+
+        async with self._page_slots:
+            pooled = await self._acquire_browser()
+            page = None
+            try:
+                try:
+                    page = await pooled.context.new_page()
+                except Exception:
+                    # The browser is unusable, retire it and let the caller fail
+                    pooled.retiring = True
+                    raise
+                self.pages_served += 1
+                yield page
+            finally:
+                if page:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                await self._release_browser(pooled)
+
+    def stats(self) -> Dict:
+        return {
+            "browsers": len(self._browsers),
+            "active_pages": sum(b.active for b in self._browsers),
+            "max_pages": self.max_pages,
+            "launches": self.launches,
+            "recycles": self.recycles,
+            "pages_served": self.pages_served,
+        }
@@ -0,0 +1,210 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Words left out when building initials ("Indian Institute of Technology" -> "iit")
+INITIALS_STOPWORDS = frozenset({"of", "and", "the", "for", "in", "at"})
+
+# "[IITB]", "-[KRCE]", "[NIT] Meghalaya": the abbreviation collegedunia puts in brackets
+BRACKET_RE = re.compile(r"\[([^\]]+)\]")
+
+# The name before its abbreviation, campus or city
+MAIN_NAME_RE = re.compile(r"^(.*?)(?:\s+-\s*|\s*\[|,|$)")
+
+# Fuzzy matches must share at least this share of the query's trigrams
+MIN_TRIGRAM_SIMILARITY = 0.35
+
+
+def normalize(text: str) -> str:
+    """Lowercase words of letters and digits, separated by single spaces"""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def aliases_for(name: str) -> set:
+    """Abbreviations a college is known by: its bracketed abbreviation and its initials"""
+    aliases = {normalize(match).replace(" ", "") for match in BRACKET_RE.findall(name)}
+    words = [w for w in normalize(MAIN_NAME_RE.match(name).group(1)).split() if w not in INITIALS_STOPWORDS]
+    if len(words) > 1:
+        aliases.add("".join(w[0] for w in words))
+    return {alias for alias in aliases if len(alias) > 1}
+
+
+class _Index:
+    """Search structures for one version of the catalog; replaced whole on reload"""
+
+    def __init__(self, links: Dict[str, str]):
+        self.names = list(links)
+        self.links = links
+        self.slugs = [links[name].strip().rstrip("/").rsplit("/", 1)[-1] for name in self.names]
+        self.by_lower = {name.lower(): name for name in self.names}
+        self.by_slug: Dict[str, str] = {}
+        self.aliases: Dict[str, List[int]] = {}
+        self.normalized: List[str] = []
+        self.trigrams: Dict[str, List[int]] = {}
+        postings: Dict[str, set] = {}
+
+        for i, (name, slug) in enumerate(zip(self.names, self.slugs)):
+            self.by_slug[slug] = name
+            text = normalize(name)
+            self.normalized.append(text)
+            for alias in aliases_for(name):
+                self.aliases.setdefault(alias, []).append(i)
+            for token in set(text.split()) | set(normalize(slug).split()):
+                postings.setdefault(token, set()).add(i)
+            for gram in trigrams(text):
+                self.trigrams.setdefault(gram, []).append(i)
+
+        # Sorted tokens, so every token starting with a prefix is one bisect range
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+
+    def prefixed(self, prefix: str) -> set:
+        """Colleges with a name or slug word starting with `prefix`"""
+        found = set()
+        start = bisect.bisect_left(self.tokens, prefix)
+        for j in range(start, len(self.tokens)):
+            if not self.tokens[j].startswith(prefix):
+                break
+            found |= self.postings[j]
+        return found
+
+    def search(self, query: str) -> List[Tuple[float, int]]:
+        """(score, college) pairs for a query, best first"""
+        text = normalize(query)
+        if not text:
+            return [(0.0, i) for i in range(len(self.names))]
+
+        scores: Dict[int, float] = {}
+
+        def offer(i: int, score: float):
+            if score > scores.get(i, 0.0):
+                scores[i] = score
+
+        for i in self.aliases.get(text.replace(" ", ""), ()):
+            offer(i, 4.0)
+
+        # Every query word is the start of some word of the name or slug
+        words = text.split()
+        matched = self.prefixed(words[0])
+        for word in words[1:]:
+            matched &= self.prefixed(word)
+        for i in matched:
+            offer(i, 3.0 if self.normalized[i].startswith(text) else 2.0)
+
+        if scores:
+            return sorted(((score, i) for i, score in scores.items()), key=lambda hit: (-hit[0], hit[1]))
+
+        # Nothing matched exactly (a misspelling, "rv coll" for "R V College"):
+        # fall back to the share of the query's trigrams found in each name
+        grams = trigrams(text)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for i in self.trigrams.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        for i, count in shared.items():
+            similarity = count / len(grams)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                offer(i, similarity)
+
+        return sorted(((score, i) for i, score in scores.items()), key=lambda hit: (-hit[0], hit[1]))
+
+
+class CollegeCatalog:
+    """The colleges in college_links.json, with a search index over their names and slugs.
+
+    The file is checked for changes at most every `check_interval` seconds
+    when the catalog is used, and reloaded when it has changed, so colleges
+    can be added without restarting the server. `version` changes with the
+    file's contents and serves as the ETag of search responses.
+    """
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._index = _Index({})
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self.version = hashlib.sha256(b"").hexdigest()[:16]
+        self.loads = 0
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        # Not retried until the file changes again, whether or not it parses
+        self._mtime = mtime
+        try:
+            links = json.loads(data)
+        except ValueError as e:
+            # Keep serving the catalog we have until the file is fixed
+            print(f"Could not load {self.path}: {e}")
+            return
+        index = _Index(links)
+        self._index = index
+        self.version = hashlib.sha256(data).hexdigest()[:16]
+        self.loads += 1
+        print(f"Loaded {len(index.names)} colleges from {self.path}")
+
+    def refresh(self):
+        """Reload the file if it changed since it was loaded"""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self._load()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index.links
+
+    def __getitem__(self, name: str) -> str:
+        return self._index.links[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index.names)
+
+    def __len__(self) -> int:
+        return len(self._index.names)
+
+    def resolve(self, query: str) -> Optional[str]:
+        """The college a request means: its exact name, its name in any case, its slug or an unambiguous alias"""
+        self.refresh()
+        index = self._index
+        if query in index.links:
+            return query
+        query = query.strip()
+        name = index.by_lower.get(query.lower()) or index.by_slug.get(query)
+        if name:
+            return name
+        matches = index.aliases.get(normalize(query).replace(" ", ""), ())
+        return index.names[matches[0]] if len(matches) == 1 else None
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+        """(total matches, one page of {name, slug}) for a search, best matches first"""
+        self.refresh()
+        index = self._index
+        hits = index.search(query)
+        page = [{"name": index.names[i], "slug": index.slugs[i]} for _, i in hits[offset:offset + limit]]
+        return len(hits), page
@@ -0,0 +1,80 @@
+import math
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+from extract import parse_amount
+
+
+class FeeTable:
+    """Fee table cells of one or more colleges in long format, held column by column.
+
+    Every non-empty cell becomes one row: college, course, table (index of
+    the fee table within its course), row (index within that table), header,
+    value (the cleaned text) and amount (the value in rupees, or None).
+    College, course and header names are stored once and referenced by
+    integer codes, so the table costs a few arrays rather than a dict per row.
+    """
+
+    COLUMNS = ("college", "course", "table", "row", "header", "value", "amount")
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.college = array("I")
+        self.course = array("I")
+        self.table = array("I")
+        self.row = array("I")
+        self.header = array("I")
+        self.value: List[str] = []
+        # NaN where the value is not an amount
+        self.amount = array("d")
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def _code(self, text: str) -> int:
+        code = self._codes.get(text)
+        if code is None:
+            code = self._codes[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+
+    def add(self, college: str, results: list):
+        """Append a college's scraped results ([{course: [row dicts]}, ...])"""
+        college_code = self._code(college)
+        previous, table_index = None, 0
+        for entry in results:
+            for course, rows in entry.items():
+                table_index = table_index + 1 if course == previous else 0
+                previous = course
+                course_code = self._code(course)
+                for row_index, row in enumerate(rows):
+                    for header, value in row.items():
+                        if not value:
+                            continue
+                        amount = parse_amount(value)
+                        self.college.append(college_code)
+                        self.course.append(course_code)
+                        self.table.append(table_index)
+                        self.row.append(row_index)
+                        self.header.append(self._code(header))
+                        self.value.append(value)
+                        self.amount.append(math.nan if amount is None else amount)
+
+    def amounts(self) -> List:
+        return [None if math.isnan(amount) else amount for amount in self.amount]
+
+    def rows(self) -> Iterator[Tuple]:
+        """Yield each row as a tuple in COLUMNS order"""
+        strings = self.strings
+        for i in range(len(self.value)):
+            amount = self.amount[i]
+            yield (
+                strings[self.college[i]],
+                strings[self.course[i]],
+                self.table[i],
+                self.row[i],
+                strings[self.header[i]],
+                self.value[i],
+                None if math.isnan(amount) else amount,
+            )
@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+from openpyxl import Workbook
+
+from dataset import FeeTable
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    # Optional: only format=parquet and format=arrow need it
+    pyarrow = None
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into and we drain"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def csv_chunks(rows: List[dict], batch: int = 500) -> Iterator[bytes]:
+    """Encode table rows as CSV, `batch` rows at a time.
+
+    The first chunk starts with a UTF-8 BOM so Excel displays symbols correctly.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(rows[0].keys())
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row.values())
+        if count % batch == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_zip(files: Iterable[Tuple[str, Iterable[bytes]]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Build a DEFLATE-compressed ZIP from (name, chunks) pairs, yielding it as it is written.
+
+    Nothing touches the disk; at most about `chunk_size` bytes of compressed
+    output are buffered before they are yielded.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
+        for name, chunks in files:
+            with zipf.open(name, "w") as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    if sink.pending >= chunk_size:
+                        yield sink.drain()
+            if sink.pending:
+                yield sink.drain()
+    if sink.pending:
+        yield sink.drain()
+
+
+def jsonl_chunks(table: FeeTable, batch: int = 1000) -> Iterator[bytes]:
+    """Encode a FeeTable as JSON Lines, one object per cell, `batch` lines at a time"""
+    lines = []
+    for row in table.rows():
+        lines.append(json.dumps(dict(zip(FeeTable.COLUMNS, row)), ensure_ascii=False))
+        if len(lines) == batch:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def xlsx_chunks(table: FeeTable) -> Iterator[bytes]:
+    """Encode a FeeTable as a one-sheet workbook, written in openpyxl's write-only mode"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("fees")
+    sheet.append(FeeTable.COLUMNS)
+    for row in table.rows():
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    yield buffer.getvalue()
+
+
+def arrow_table(table: FeeTable) -> "pyarrow.Table":
+    """The FeeTable as a pyarrow.Table, with names as dictionary columns"""
+    names = pyarrow.array(table.strings, pyarrow.string())
+
+    def names_column(codes):
+        return pyarrow.DictionaryArray.from_arrays(pyarrow.array(codes, pyarrow.int32()), names)
+
+    return pyarrow.table({
+        "college": names_column(table.college),
+        "course": names_column(table.course),
+        "table": pyarrow.array(table.table, pyarrow.int32()),
+        "row": pyarrow.array(table.row, pyarrow.int32()),
+        "header": names_column(table.header),
+        "value": pyarrow.array(table.value, pyarrow.string()),
+        "amount": pyarrow.array(table.amounts(), pyarrow.float64()),
+    })
+
+
+def parquet_chunks(table: FeeTable) -> Iterator[bytes]:
+    sink = pyarrow.BufferOutputStream()
+    pyarrow.parquet.write_table(arrow_table(table), sink, compression="zstd")
+    yield sink.getvalue().to_pybytes()
+
+
+def arrow_chunks(table: FeeTable) -> Iterator[bytes]:
+    """Encode a FeeTable in the Arrow IPC file format"""
+    data = arrow_table(table)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_file(sink, data.schema) as writer:
+        writer.write_table(data)
+    yield sink.getvalue().to_pybytes()
+
+
+# format=... -> (encoder, media type, file extension)
+DATASET_FORMATS = {
+    "jsonl": (jsonl_chunks, "application/x-ndjson", "jsonl"),
+    "xlsx": (xlsx_chunks, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": (parquet_chunks, "application/vnd.apache.parquet", "parquet"),
+    "arrow": (arrow_chunks, "application/vnd.apache.arrow.file", "arrow"),
+}
+ARROW_FORMATS = ("parquet", "arrow")
+
+
+def format_available(format: str) -> bool:
+    return format not in ARROW_FORMATS or pyarrow is not None
@@ -0,0 +1,144 @@
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional
+
+# "check details", "view detail", "see details", ... with the whitespace around them
+CLEANUP_RE = re.compile(r"\s*(?:check|view|see)\s+details?\s*", re.IGNORECASE)
+
+# Reads a fee table element into {header: [...], rows: [[...], ...]} inside the page.
+# textContent matches what BeautifulSoup's .text returned for the same cells.
+READ_TABLE_JS = """(t) => {
+    const trs = Array.from(t.querySelectorAll("tr"));
+    const header = trs.length ? Array.from(trs[0].querySelectorAll("th"), (c) => c.textContent) : [];
+    const rows = [];
+    for (const tr of trs.slice(1)) {
+        const cells = tr.querySelectorAll("td");
+        if (cells.length) rows.push(Array.from(cells, (c) => c.textContent));
+    }
+    return {header, rows};
+}"""
+
+# For locator.evaluate_all on the fee tables themselves
+READ_TABLES_JS = f"(tables) => tables.map({READ_TABLE_JS})"
+
+# "₹ 2,17,000 per year", "Rs. 1.5 Lakhs (1st Yr Fees)", "85000/-": an amount at the
+# start of a cell, with whatever follows it ignored
+AMOUNT_RE = re.compile(
+    r"^(?P<currency>₹|rs\.?|inr)?\s*(?P<number>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?P<unit>(?:lakhs?|lacs?|l|crores?|cr|k)\b)?\s*(?P<rupees>/-)?",
+    re.IGNORECASE,
+)
+# Thousands grouped the Indian or Western way: "2,17,000", "217,000"
+GROUPED_RE = re.compile(r"\d{1,3}(?:,\d{2,3})+(?:\.\d+)?")
+AMOUNT_UNITS = {"k": 1e3, "l": 1e5, "lac": 1e5, "lakh": 1e5, "cr": 1e7, "crore": 1e7}
+
+
+def clean_cell_text(text: str) -> str:
+    """Remove 'check details' and similar phrases from cell text"""
+    if not text:
+        return text
+    return " ".join(CLEANUP_RE.sub("", text).split())
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """Rupee amount of a fee cell such as "₹ 2,17,000" or "1.5 Lakhs", or None.
+
+    A bare number ("1", "2021-22", "1-2 years") is not taken for an amount:
+    it needs a currency sign, a unit, grouped thousands or a trailing "/-".
+    Text after a marked amount ("per year", "+ GST") does not matter.
+    """
+    match = AMOUNT_RE.match(text or "")
+    if not match:
+        return None
+    number, unit = match.group("number"), match.group("unit")
+    if not (match.group("currency") or unit or match.group("rupees") or GROUPED_RE.fullmatch(number)):
+        return None
+    amount = float(number.replace(",", ""))
+    if unit:
+        amount *= AMOUNT_UNITS[unit.lower().rstrip("s")]
+    return amount
+
+
+def tables_to_rows(tables: Iterable[Dict], name: str) -> List[Dict]:
+    """Turn extracted {header, rows} tables into [{course_name: [row dicts]}, ...]"""
+    data_list = []
+    for table in tables:
+        header = [h.strip() for h in table["header"]]
+        data = [
+            dict(zip(header, [clean_cell_text(cell.strip()) for cell in row]))
+            for row in table["rows"]
+        ]
+        data_list.append({name: data})
+    return data_list
+
+
+class _TableReader(HTMLParser):
+    """Collects the header and body cells of one table's markup"""
+
+    def __init__(self):
+        super().__init__()
+        self.header: List[str] = []
+        self.rows: List[List[str]] = []
+        self._row: List[str] = None
+        self._rows_seen = 0
+        self._cell: List[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._finish_cell()
+            self._finish_row()
+            self._row = []
+            self._rows_seen += 1
+        elif tag in ("td", "th") and self._row is not None:
+            self._finish_cell()
+            # Header cells come from the first row, body cells from the rest
+            if (tag == "th") == (self._rows_seen == 1):
+                self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th"):
+            self._finish_cell()
+        elif tag in ("tr", "table"):
+            self._finish_cell()
+            self._finish_row()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _finish_cell(self):
+        if self._cell is not None:
+            self._row.append("".join(self._cell))
+            self._cell = None
+
+    def _finish_row(self):
+        if self._row is None:
+            return
+        if self._rows_seen == 1:
+            self.header = self._row
+        elif self._row:
+            self.rows.append(self._row)
+        self._row = None
+
+
+def fee_tables_in_html(html: str, table_class: str) -> List[Dict]:
+    """Extract {header, rows} from every table whose class is exactly `table_class`.
+
+    Only the markup of those tables is parsed; the rest of the page is
+    skipped with a regex search. Used for saved pages, where there is no
+    browser to run READ_TABLES_JS in.
+    """
+    opening = re.compile(r'<table\b[^>]*\bclass="' + re.escape(table_class) + r'"[^>]*>', re.IGNORECASE)
+    tables = []
+    position = 0
+    while True:
+        match = opening.search(html, position)
+        if not match:
+            return tables
+        end = html.find("</table>", match.end())
+        end = len(html) if end == -1 else end + len("</table>")
+        reader = _TableReader()
+        reader.feed(html[match.start():end])
+        reader.close()
+        tables.append({"header": reader.header, "rows": reader.rows})
+        position = end
@@ -0,0 +1,37 @@
+import asyncio
+from typing import Any, AsyncIterator, List
+
+
+class CourseFeed:
+    """Append-only event feed that any number of readers can follow.
+
+    Every reader sees all events from the beginning, so a reader that
+    joins late still gets the courses published before it arrived.
+    """
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def publish(self, item: Any):
+        self.items.append(item)
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[Any]:
+        position = 0
+        while True:
+            while position < len(self.items):
+                yield self.items[position]
+                position += 1
+            if self.closed:
+                return
+            await self._changed.wait()
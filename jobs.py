@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+class Job:
+    """One queued scrape and, once it finishes, its downloadable artifact"""
+
+    def __init__(self, college: str, user: str, priority: int = 0, options: Optional[Dict] = None):
+        self.id = uuid.uuid4().hex
+        self.college = college
+        self.user = user
+        self.priority = priority
+        self.options = options or {}
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Zero-argument callable returning the (name, chunks) files of the result ZIP
+        self.artifact: Optional[Callable[[], Iterable]] = None
+        self.result_name: Optional[str] = None
+        self.report: Optional[List[Dict]] = None
+        self.seq = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "error", "cancelled")
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "college": self.college,
+            "status": self.status,
+            "priority": self.priority,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result_ready": self.status == "completed" and self.artifact is not None,
+            "report": self.report,
+        }
+
+
+class JobQueue:
+    """Bounded job queue drained by a fixed number of worker tasks.
+
+    Higher priority jobs run first. Among jobs of equal priority, users
+    take turns: the user served least recently goes next, so one user
+    submitting many colleges cannot starve everyone else. Finished jobs
+    are dropped `ttl` seconds after they finish.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Job], Awaitable],
+        workers: int = 2,
+        max_queued: int = 100,
+        ttl: float = 300,
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.ttl = ttl
+
+        self._jobs: Dict[str, Job] = {}
+        self._pending: Dict[str, List] = {}  # user -> heap of (-priority, seq, job)
+        self._last_served: Dict[str, int] = {}
+        self._counter = itertools.count(1)
+        self._queued = 0
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = 0
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    async def submit(self, job: Job) -> Job:
+        """Queue a job; raises asyncio.QueueFull when the queue is at capacity"""
+        if self._queued >= self.max_queued:
+            raise asyncio.QueueFull()
+        job.seq = next(self._counter)
+        self._jobs[job.id] = job
+        heapq.heappush(self._pending.setdefault(job.user, []), (-job.priority, job.seq, job))
+        self._queued += 1
+        async with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def position(self, job: Job) -> Optional[int]:
+        """1-based place of a queued job in the order workers will pick it up"""
+        if job.status != "queued":
+            return None
+        # Replay the turns _pop_next would take on a copy of the queue
+        pending = {user: sorted(heap) for user, heap in self._pending.items() if heap}
+        served = dict(self._last_served)
+        turns = itertools.count(max(served.values(), default=0) + 1)
+        place = 0
+        while pending:
+            user = self._next_user(pending, served)
+            _, _, queued = pending[user].pop(0)
+            place += 1
+            if queued is job:
+                return place
+            if not pending[user]:
+                del pending[user]
+            served[user] = next(turns)
+        return None
+
+    @staticmethod
+    def _next_user(pending: Dict[str, List], served: Dict[str, int]) -> str:
+        """Owner of the next job: highest priority, then the user served least recently, then oldest"""
+        def key(user):
+            priority, seq, _ = pending[user][0]
+            return (priority, served.get(user, 0), seq)
+
+        return min((user for user, heap in pending.items() if heap), key=key)
+
+    def _pop_next(self) -> Job:
+        user = self._next_user(self._pending, self._last_served)
+        _, _, job = heapq.heappop(self._pending[user])
+        if not self._pending[user]:
+            del self._pending[user]
+        self._last_served[user] = next(self._counter)
+        self._queued -= 1
+        return job
+
+    async def _worker(self):
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._queued > 0)
+                job = self._pop_next()
+
+            job.status = "running"
+            job.started_at = time.time()
+            self._running += 1
+            try:
+                await self.runner(job)
+                if job.status == "running":
+                    job.status = "completed"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                raise
+            except Exception as e:
+                job.status = "error"
+                job.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                print(f"Job {job.id} failed: {job.error}")
+            finally:
+                job.finished_at = time.time()
+                self._running -= 1
+
+    def expire(self, now: float = None) -> List[Job]:
+        """Forget jobs that finished more than `ttl` seconds ago and return them"""
+        now = now or time.time()
+        expired = [
+            job for job in self._jobs.values()
+            if job.finished and job.finished_at and now - job.finished_at > self.ttl
+        ]
+        for job in expired:
+            del self._jobs[job.id]
+        return expired
@@ -1,71 +1,147 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import HTMLResponse, JSONResponse
-from playwright.async_api import async_playwright
-from playwright.sync_api import sync_playwright
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 import asyncio
-from bs4 import BeautifulSoup
-import concurrent.futures
+from contextlib import asynccontextmanager
 import json
 import sys
-from fastapi.responses import FileResponse
-from openpyxl import Workbook
+from fastapi.responses import StreamingResponse
 import os
-import csv
-from fastapi import BackgroundTasks
-import zipfile
-import uuid
-from typing import Dict
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+import time
 import traceback
+import uuid
 import re
+from browser_pool import BrowserPool
+from result_cache import ResultCache, content_hash
+from singleflight import SingleFlight
+from jobs import Job, JobQueue
+from ratelimit import HostRateLimiter
+from resilience import HostCircuitBreakers, RetryPolicy
+from export import DATASET_FORMATS, csv_chunks, format_available, stream_zip
+from dataset import FeeTable
+from feeds import CourseFeed
+from progress import FINISHED_STATUSES, create_progress_store
+from extract import READ_TABLE_JS, tables_to_rows
+from request_policy import policy_from_settings
+from selector_registry import SelectorRegistry, layout_key
+from catalog import CollegeCatalog
+from telemetry import Profile, Telemetry
+from task_queue import SQLiteTaskQueue
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-def delete_file(path: str):
-    try:
-        if os.path.exists(path):
-            os.remove(path)
-    except Exception as e:
-        print("File delete error:", e)
-
-def cleanup_progress(task_id: str):
-    try:
-        if task_id in progress_store:
-            progress_store.pop(task_id)
-    except Exception as e:
-        print("Progress cleanup error:", e)
 
 
 if sys.platform == "win32":
-    # Keep ProactorEventLoop for FastAPI compatibility
-    # Playwright should work with it, but we'll handle any issues in the code
+    # Async Playwright launches browsers as subprocesses, which needs ProactorEventLoop
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-# Thread pool for running sync playwright operations
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+# Site the college links are relative to (overridable for local fixtures)
+BASE_URL = os.environ.get("COLLEGEDUNIA_BASE_URL", "https://collegedunia.com").rstrip("/")
+
+# Requests scraping pages skip: images, media, fonts and trackers by default,
+# and optionally any script not served from SCRIPT_ALLOWLIST hosts
+request_policy = policy_from_settings(
+    os.environ.get("BLOCK_RESOURCES", "image,media,font"),
+    os.environ.get("BLOCK_TRACKERS", "1") not in ("0", "false", "no"),
+    os.environ.get("SCRIPT_ALLOWLIST", ""),
+)
+
+# Phase timings of the scrape pipeline, exported on /metrics
+telemetry = Telemetry()
+
+# Long-lived browsers shared by all requests, started with the app
+browser_pool = BrowserPool(
+    size=int(os.environ.get("BROWSER_POOL_SIZE", "2")),
+    max_pages=int(os.environ.get("BROWSER_POOL_MAX_PAGES", "5")),
+    max_uses=int(os.environ.get("BROWSER_POOL_MAX_USES", "50")),
+    request_policy=request_policy,
+    telemetry=telemetry,
+)
 
+# Where profile=true requests write their span-by-span timings
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
 
-app = FastAPI()
+# Scraped results, reused until the TTL expires (RESULT_CACHE_TTL=0 disables it)
+result_cache = ResultCache(
+    os.environ.get("RESULT_CACHE_PATH", "scrape_cache.sqlite3"),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", str(7 * 24 * 3600))),
+    max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+)
 
-# Load college links
-try:
-    with open("college_links.json", "r", encoding="utf-8") as f:
-        COLLEGE_LINKS = json.load(f)
-except:
-    COLLEGE_LINKS = {}
+# Page loads per second allowed against one host, shared by every scrape
+host_limiter = HostRateLimiter(
+    rate=float(os.environ.get("HOST_RATE_LIMIT", "3")),
+    burst=int(os.environ.get("HOST_RATE_BURST", "6")),
+)
 
-# Progress tracking storage
-progress_store: Dict[str, Dict] = {}
+# Failed course pages are retried with jittered exponential backoff
+retry_policy = RetryPolicy(
+    attempts=int(os.environ.get("RETRY_ATTEMPTS", "3")),
+    base_delay=float(os.environ.get("RETRY_BASE_DELAY", "1")),
+    max_delay=float(os.environ.get("RETRY_MAX_DELAY", "15")),
+)
 
-def clean_cell_text(text: str) -> str:
-    """Remove 'check details' and similar phrases from cell text"""
-    if not text:
-        return text
-    # Remove "check details" (case-insensitive) and variations
-    # Remove "check details", "check detail", "view details", etc.
-    text = re.sub(r'\s*check\s+details?\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\s*view\s+details?\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\s*see\s+details?\s*', '', text, flags=re.IGNORECASE)
-    # Clean up extra spaces
-    text = ' '.join(text.split())
-    return text.strip()
+# New page work against a host pauses while most recent attempts on it fail
+host_breakers = HostCircuitBreakers(
+    failure_ratio=float(os.environ.get("BREAKER_FAILURE_RATIO", "0.5")),
+    window=int(os.environ.get("BREAKER_WINDOW", "20")),
+    min_calls=int(os.environ.get("BREAKER_MIN_CALLS", "8")),
+    cooldown=float(os.environ.get("BREAKER_COOLDOWN", "30")),
+)
+
+# Pages one scrape may keep open at once (the pool caps the total across scrapes)
+SCRAPE_CONCURRENCY = int(os.environ.get("SCRAPE_CONCURRENCY", "5"))
+
+
+# Seconds finished jobs and progress entries are kept around
+FINISHED_TTL = float(os.environ.get("FINISHED_TTL", "300"))
+
+# SCRAPE_BACKEND=queue leaves page work to worker processes (python worker.py)
+# that share the task queue file; the app only queues tasks and gathers results
+SCRAPE_BACKEND = os.environ.get("SCRAPE_BACKEND", "local")
+TASK_QUEUE_PATH = os.environ.get("TASK_QUEUE_PATH", "scrape_queue.sqlite3")
+# Seconds a worker may go silent before its tasks are handed to another worker
+TASK_QUEUE_LEASE = float(os.environ.get("TASK_QUEUE_LEASE", "60"))
+# Seconds between checks for finished tasks (and for new work, in workers)
+TASK_QUEUE_POLL = float(os.environ.get("TASK_QUEUE_POLL", "0.2"))
+
+task_queue = SQLiteTaskQueue(TASK_QUEUE_PATH, lease=TASK_QUEUE_LEASE) if SCRAPE_BACKEND == "queue" else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # With a task queue the workers own the browsers
+    if task_queue is None:
+        await browser_pool.start()
+    await job_queue.start()
+    janitor = asyncio.create_task(expire_finished())
+    try:
+        yield
+    finally:
+        janitor.cancel()
+        await job_queue.stop()
+        if task_queue is None:
+            await browser_pool.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# College names and links, reloaded when the file changes
+college_catalog = CollegeCatalog(
+    os.environ.get("COLLEGE_LINKS_PATH", "college_links.json"),
+    check_interval=float(os.environ.get("COLLEGE_LINKS_CHECK_INTERVAL", "2")),
+)
+
+# Progress tracking storage (PROGRESS_BACKEND=sqlite shares it between uvicorn workers)
+progress_store = create_progress_store(
+    os.environ.get("PROGRESS_BACKEND", "memory"),
+    os.environ.get("PROGRESS_DB", "progress.sqlite3"),
+)
+
+def college_slug(college: str) -> str:
+    """Stable key for a college: the last segment of its collegedunia link"""
+    return college_catalog[college].strip().rstrip("/").rsplit("/", 1)[-1]
 
 def sanitize_filename(name: str, max_length: int = 100) -> str:
     """Sanitize and shorten filename to avoid Windows path length issues"""
@@ -85,394 +161,1647 @@ def sanitize_filename(name: str, max_length: int = 100) -> str:
     name = name.strip('_')
     return name if name else "file"
 
+COURSE_BUTTON_SELECTOR = "span[class='jsx-3955509628 icon icon-20 clg-sprite arrow-d-blue-20 mr-1 ']"
+COURSE_BLOCK_SELECTOR = 'div[class="jsx-3955509628 course-detail d-flex justify-content-between"]'
+FEE_TABLE_CLASS = "jsx-2530098677 table-new table-responsive"
+FEE_TABLE_SELECTOR = f'table[class="{FEE_TABLE_CLASS}"]'
+
+# Ranked fallbacks for each element; the class-token ones survive the
+# jsx-<hash> class names changing when the site redeploys
+page_selectors = SelectorRegistry({
+    "course_button": [
+        COURSE_BUTTON_SELECTOR,
+        "span.icon-20.clg-sprite.arrow-d-blue-20",
+        "span.arrow-d-blue-20",
+        "div.course-detail span[class*='arrow-d']",
+        "button[aria-expanded='false']",
+    ],
+    "course_block": [
+        COURSE_BLOCK_SELECTOR,
+        "div.course-detail.d-flex",
+        "div.course-detail",
+        "div[class*='course-detail']",
+    ],
+    "fee_table": [
+        FEE_TABLE_SELECTOR,
+        "table.table-new.table-responsive",
+        "table.table-new",
+    ],
+})
+
+# Seconds to wait for the course toggles to appear after navigating
+READY_TIMEOUT = float(os.environ.get("SCRAPE_READY_TIMEOUT", "30"))
+# Seconds to wait for a course's tables to render after expanding it
+EXPAND_TIMEOUT = float(os.environ.get("SCRAPE_EXPAND_TIMEOUT", "8"))
+# Milliseconds the fee tables' row count must hold steady before they are read
+SETTLE_MS = int(os.environ.get("SCRAPE_SETTLE_MS", "500"))
+
+# In-browser helpers for the single-page scrape; tables come back as {header, rows}
+HARVEST_NEW_TABLES_JS = """(sel) => {
+    const readTable = %s;
+    const fresh = [];
+    document.querySelectorAll(sel).forEach((t) => {
+        if (!t.dataset.scrapeSeen) {
+            t.dataset.scrapeSeen = "1";
+            fresh.push(readTable(t));
+        }
+    });
+    return fresh;
+}""" % READ_TABLE_JS
+ROWS_SETTLED_JS = """([sel, quietMs]) => {
+    let n = 0;
+    document.querySelectorAll(sel).forEach((t) => { n += t.rows ? t.rows.length : 0; });
+    const all = window.__scrapeSettle || (window.__scrapeSettle = {});
+    const w = all[sel] || (all[sel] = {n: -1, since: Date.now()});
+    if (n !== w.n) {
+        w.n = n;
+        w.since = Date.now();
+        return false;
+    }
+    return n > 0 && Date.now() - w.since > quietMs;
+}"""
+TABLES_BY_BLOCK_JS = """([blockSel, tableSel]) => {
+    const readTable = %s;
+    const blocks = new Set(document.querySelectorAll(blockSel));
+    const out = [];
+    let current = -1;
+    document.querySelectorAll(blockSel + ", " + tableSel).forEach((el) => {
+        if (blocks.has(el)) {
+            current += 1;
+        } else if (current >= 0) {
+            out.push([current, readTable(el)]);
+        }
+    });
+    return out;
+}""" % READ_TABLE_JS
+# Fee tables that follow course block `index` in the DOM (before the next block) and
+# were not read yet; the first form waits for one, the second reads them and marks them read
+BLOCK_TABLES_WALK_JS = """const blocks = new Set(document.querySelectorAll(blockSel));
+    const fresh = [];
+    let current = -1;
+    document.querySelectorAll(blockSel + ", " + tableSel).forEach((el) => {
+        if (blocks.has(el)) {
+            current += 1;
+        } else if (current === index && !el.dataset.scrapeSeen) {
+            fresh.push(el);
+        }
+    });"""
+BLOCK_HAS_NEW_TABLES_JS = """([blockSel, tableSel, index]) => {
+    %s
+    return fresh.length > 0;
+}""" % BLOCK_TABLES_WALK_JS
+HARVEST_BLOCK_TABLES_JS = """([blockSel, tableSel, index]) => {
+    const readTable = %s;
+    %s
+    return fresh.map((t) => {
+        t.dataset.scrapeSeen = "1";
+        return readTable(t);
+    });
+}""" % (READ_TABLE_JS, BLOCK_TABLES_WALK_JS)
+COURSE_NAMES_JS = """(blocks) => blocks.map((b) => {
+    const a = b.querySelector("a");
+    return a ? a.innerText.trim() : "";
+})"""
+# Name and full listing text of each course block, for change detection
+COURSE_LISTING_JS = """(blocks) => blocks.map((b) => {
+    const a = b.querySelector("a");
+    return [a ? a.innerText.trim() : "", b.innerText];
+})"""
+
+
+# -------- SCRAPING HELPERS (POOLED BROWSERS) --------
+async def open_url(page, url: str):
+    """Navigate once the host's rate limit allows another page load"""
+    with telemetry.span("rate_limit"):
+        await host_limiter.acquire(url)
+    with telemetry.span("navigation"):
+        await page.goto(url, timeout=60000)
+
+
+async def wait_for_rows_settled(page, table_selector: str, timeout: float) -> bool:
+    """Wait until the fee tables stop gaining rows; False if they are still changing after `timeout` seconds"""
+    try:
+        await page.wait_for_function(
+            ROWS_SETTLED_JS, arg=[table_selector, SETTLE_MS], polling=100, timeout=timeout * 1000
+        )
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_for_block_tables(page, block_selector: str, table_selector: str, index: int,
+                                timeout: float) -> bool:
+    """Wait until course block `index` has a fee table after it that was not read yet"""
+    try:
+        await page.wait_for_function(
+            BLOCK_HAS_NEW_TABLES_JS, arg=[block_selector, table_selector, index], polling=100,
+            timeout=timeout * 1000
+        )
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def course_names(page, layout: str) -> list:
+    """Course names in page order, or [] if no course block can be found"""
+    block_selector = await page_selectors.resolve(page, "course_block", layout, EXPAND_TIMEOUT)
+    if block_selector is None:
+        return []
+    return await page.locator(block_selector).evaluate_all(COURSE_NAMES_JS)
+
+
+async def scrape_table(page, url: str, index: int) -> list:
+    """Expand course `index` on a fresh load of the courses-fees page and parse its tables"""
+    layout = layout_key(url)
+    await open_url(page, url)
+    with telemetry.span("wait"):
+        await page.wait_for_load_state("load")
+        button_selector = await page_selectors.resolve(page, "course_button", layout, READY_TIMEOUT)
+    if button_selector is None:
+        raise NoCoursesFound(url)
+
+    with telemetry.span("expand"):
+        # Tables on the page before the click do not signal that this course expanded
+        await page.evaluate(HARVEST_NEW_TABLES_JS, page_selectors.union("fee_table"))
+        button = page.locator(button_selector).nth(index)
+        await button.scroll_into_view_if_needed()
+        await button.click()
+
+    with telemetry.span("wait"):
+        table_selector = await page_selectors.resolve(page, "fee_table", layout, EXPAND_TIMEOUT, unseen=True)
+        if table_selector is not None:
+            await wait_for_rows_settled(page, table_selector, EXPAND_TIMEOUT)
+    if table_selector is None:
+        print(f"No fee tables rendered for course {index + 1}")
+        return []
+
+    with telemetry.span("parse"):
+        # Read just the tables this click rendered instead of parsing all of the page's HTML
+        tables = await page.evaluate(HARVEST_NEW_TABLES_JS, page_selectors.union("fee_table"))
+        names = await course_names(page, layout)
+        name = names[index] if index < len(names) and names[index] else f"Course {index + 1}"
+        return tables_to_rows(tables, name)
+
+
+def course_status(index: int, tables: list, attempts: int = 1, error: str = None) -> Dict:
+    """One course's line in the course_status.json report"""
+    return {
+        "index": index,
+        "course": next(iter(tables[0])) if tables else None,
+        "status": "failed" if error else ("ok" if tables else "empty"),
+        "attempts": attempts,
+        "tables": len(tables),
+        "error": error,
+    }
+
+
+async def scrape_single_course(index: int, url: str, task_id: str = None, pool: BrowserPool = None):
+    """Scrape the fee tables of one course, retrying failures on a fresh page.
+
+    Returns (tables, status); a course that failed every attempt has no
+    tables and a "failed" status instead of raising.
+    """
+    pool = pool or browser_pool
+    attempts = 0
+
+    async def attempt():
+        nonlocal attempts
+        attempts += 1
+        async with pool.page() as page:
+            return await scrape_table(page, url, index)
+
+    try:
+        with telemetry.span("course", course=index):
+            data_list = await retry_policy.run(attempt, host_breakers.breaker(url), give_up=(NoCoursesFound,))
+        status = course_status(index, data_list, attempts)
+    except Exception as e:
+        print(f"Error scraping table {index + 1} after {attempts} attempts: {e}")
+        traceback.print_exc()
+        data_list = []
+        status = course_status(index, data_list, attempts, error=f"{type(e).__name__}: {e}")
+    telemetry.count_course(status["status"])
+
+    # Update progress
+    entry = progress_store.increment(task_id, "current")
+    if entry:
+        total = entry.get("total", 1) or 1
+        done = entry["current"]
+        progress_store.update(
+            task_id,
+            message=f"Scraping course {done} of {total}...",
+            percentage=15 + int(done / total * 50)  # 15-65% for scraping
+        )
+
+    return data_list, status
+
+
+async def get_total_courses(url: str, pool: BrowserPool = None) -> int:
+    """Count the course toggles on the courses-fees page"""
+    pool = pool or browser_pool
+
+    async def count():
+        async with pool.page() as page:
+            layout = layout_key(url)
+            await open_url(page, url)
+
+            with telemetry.span("wait"):
+                # Returns as soon as any known toggle selector matches
+                selector = await page_selectors.resolve(page, "course_button", layout, READY_TIMEOUT)
+                if selector is None:
+                    # No toggles: count the course blocks instead
+                    selector = await page_selectors.resolve(page, "course_block", layout, EXPAND_TIMEOUT)
+
+            total_buttons = 0
+            if selector:
+                total_buttons = await page.locator(selector).count()
+                print(f"Found {total_buttons} courses using selector: {selector}")
+
+            # Debug: Print page title and URL
+            print(f"Page URL: {page.url}")
+            print(f"Page title: {await page.title()}")
+
+            return total_buttons
+
+    try:
+        return await retry_policy.run(count, host_breakers.breaker(url))
+    except Exception as e:
+        print(f"Error getting total courses: {e}")
+        traceback.print_exc()
+        return 0
+
+
+async def scrape_all_courses(url: str, task_id: str = None, expand: str = "sequential",
+                             pool: BrowserPool = None, on_course=None, on_status=None,
+                             indices: list = None) -> list:
+    """Load the courses-fees page once, expand every course and parse all tables.
+
+    expand="sequential" clicks the toggles one by one and collects the tables
+    each click renders; expand="all" clicks them all and then assigns tables
+    to the course block that precedes them. Raises on failure so the caller
+    can fall back to the per-course path. `on_course(index, tables)` is
+    called as soon as each course has been parsed, and `on_status(status)`
+    with its course_status(). Only the courses in `indices` are expanded
+    when it is given.
+    """
+    pool = pool or browser_pool
+    data_list = []
+
+    def parse_course(i):
+        if not fragments[i]:
+            return []
+        name = names[i] if i < len(names) and names[i] else f"Course {i + 1}"
+        return tables_to_rows(fragments[i], name)
+
+    def add_course(i, tables):
+        telemetry.count_course("ok" if tables else "empty")
+        data_list.extend(tables)
+        if on_course and tables:
+            on_course(i, tables)
+        if on_status:
+            on_status(course_status(i, tables))
+
+    layout = layout_key(url)
+    async with pool.page() as page:
+        await open_url(page, url)
+        with telemetry.span("wait"):
+            button_selector = await page_selectors.resolve(page, "course_button", layout, READY_TIMEOUT)
+        if button_selector is None:
+            raise NoCoursesFound(url)
+
+        buttons = page.locator(button_selector)
+        count = await buttons.count()
+        names = await course_names(page, layout)
+        selected = [i for i in indices if i < count] if indices is not None else list(range(count))
+        total = len(selected)
+        progress_store.update(
+            task_id,
+            total=total,
+            percentage=15,
+            message=f"Found {total} courses. Expanding all courses..."
+        )
+
+        fragments = {i: [] for i in selected}
+        if expand == "all":
+            with telemetry.span("expand"):
+                await buttons.evaluate_all(
+                    "(els, wanted) => els.forEach((el, i) => wanted.includes(i) && el.click())", selected
+                )
+            with telemetry.span("wait"):
+                table_selector = await page_selectors.resolve(page, "fee_table", layout, EXPAND_TIMEOUT)
+                settled = table_selector is not None and await wait_for_rows_settled(
+                    page, table_selector, EXPAND_TIMEOUT + total * 0.5
+                )
+            if table_selector is None:
+                print("No fee tables rendered after expanding every course")
+            else:
+                if not settled:
+                    print("Fee tables did not settle before the timeout, using what rendered")
+                with telemetry.span("parse"):
+                    block_selector = page_selectors.ranked("course_block", layout)[0]
+                    for index, table in await page.evaluate(
+                        TABLES_BY_BLOCK_JS, [block_selector, table_selector]
+                    ):
+                        if index in fragments:
+                            fragments[index].append(table)
+
+            with telemetry.span("parse"):
+                parsed = {i: parse_course(i) for i in selected}
+            for i in selected:
+                add_course(i, parsed[i])
+        else:
+            # Tables present before any click do not belong to an expanded course
+            any_fee_table = page_selectors.union("fee_table")
+            await page.evaluate(HARVEST_NEW_TABLES_JS, any_fee_table)
+            block_selector = page_selectors.ranked("course_block", layout)[0]
+            for done, i in enumerate(selected, start=1):
+                with telemetry.span("course", course=i):
+                    with telemetry.span("expand"):
+                        button = buttons.nth(i)
+                        await button.scroll_into_view_if_needed()
+                        await button.click()
+                    with telemetry.span("wait"):
+                        # Wait for tables under this course's block, so tables an earlier
+                        # course rendered late are not taken for this one's
+                        table_selector = await page_selectors.resolve(
+                            page, "fee_table", layout, EXPAND_TIMEOUT, unseen=True
+                        )
+                        rendered = table_selector is not None and await wait_for_block_tables(
+                            page, block_selector, any_fee_table, i, EXPAND_TIMEOUT
+                        )
+                        if rendered:
+                            await wait_for_rows_settled(page, table_selector, EXPAND_TIMEOUT)
+                    with telemetry.span("parse"):
+                        if rendered:
+                            fragments[i] = await page.evaluate(
+                                HARVEST_BLOCK_TABLES_JS, [block_selector, any_fee_table, i]
+                            )
+                        tables = parse_course(i)
+                if not rendered:
+                    print(f"No fee tables rendered for course {i + 1}")
+                add_course(i, tables)
+
+                progress_store.update(
+                    task_id,
+                    current=done,
+                    message=f"Expanded course {done} of {total}...",
+                    percentage=15 + int(done / total * 50)
+                )
+
+    return data_list
+
+
+class NoCoursesFound(Exception):
+    """The courses-fees page has no course toggles"""
+
+
+async def scrape_courses(url: str, total: int, task_id: str = None, concurrency: int = None,
+                         pool: BrowserPool = None, limit: asyncio.Semaphore = None,
+                         on_course=None, on_status=None, indices: list = None) -> list:
+    """Scrape courses 0..total-1 (or just `indices`) concurrently on the event loop.
+
+    At most `concurrency` pages are open for this call; the pool's own page
+    cap bounds the total across all calls. Cancelling this coroutine cancels
+    every course that is still running. Passing `limit` shares one page
+    budget between several calls instead.
+    """
+    pool = pool or browser_pool
+    limit = limit or asyncio.Semaphore(max(1, min(concurrency or SCRAPE_CONCURRENCY, pool.max_pages)))
+
+    async def worker(index):
+        async with limit:
+            tables, status = await scrape_single_course(index, url, task_id, pool)
+        if on_course and tables:
+            on_course(index, tables)
+        if on_status:
+            on_status(status)
+        return tables
+
+    if indices is None:
+        indices = range(total)
+    tasks = [asyncio.create_task(worker(i)) for i in indices if i < total]
+    try:
+        # Collect results as they complete
+        results = []
+        for future in asyncio.as_completed(tasks):
+            try:
+                results.extend(await future)
+            except Exception as e:
+                print(f"Error in parallel scraping: {e}")
+        return results
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def scrape_college(url: str, task_id: str = None, mode: str = "single_page",
+                         expand: str = "sequential", concurrency: int = None,
+                         pool: BrowserPool = None, limit: asyncio.Semaphore = None,
+                         on_course=None, on_status=None, indices: list = None) -> list:
+    """Scrape every course of one college, falling back to per-course pages if needed.
+
+    `on_course(index, tables)` is called for each course as it finishes, and
+    `on_status(status)` with the course's course_status() entry. With
+    `indices`, only those courses are scraped.
+    """
+    if task_queue is not None:
+        return await queued_scrape_college(url, task_id, mode, expand, on_course, on_status, indices)
+
+    pool = pool or browser_pool
+    limit = limit or asyncio.Semaphore(max(1, min(concurrency or SCRAPE_CONCURRENCY, pool.max_pages)))
+    results = []
+    if mode == "single_page":
+        progress_store.update(task_id, percentage=10, message="Loading course page...")
+        statuses = []
+        try:
+            async with limit:
+                results = await host_breakers.breaker(url).call(
+                    lambda: scrape_all_courses(url, task_id, expand=expand, pool=pool, on_course=on_course,
+                                               on_status=statuses.append, indices=indices),
+                    give_up=(NoCoursesFound,),
+                )
+        except Exception as e:
+            print(f"Single-page scrape failed: {type(e).__name__} - {e}")
+            traceback.print_exc()
+            results = []
+        if results:
+            if on_status:
+                for status in statuses:
+                    on_status(status)
+            return results
+        print("Single-page scrape returned no data, falling back to per-course scraping")
+
+    # Per-course path: one page load per course
+    progress_store.update(task_id, current=0, percentage=10, message="Counting courses...")
+
+    async with limit:
+        total_buttons = await get_total_courses(url, pool=pool)
+    if total_buttons == 0:
+        raise NoCoursesFound(url)
+
+    progress_store.update(
+        task_id,
+        total=total_buttons if indices is None else len(indices),
+        percentage=15,
+        message=f"Found {total_buttons} courses. Starting parallel scraping..."
+    )
+
+    return await scrape_courses(
+        url, total_buttons, task_id, concurrency, pool, limit, on_course, on_status, indices
+    )
+
+
+# -------- SCRAPE WORKERS --------
+def task_error(result: Dict, url: str) -> Exception:
+    """The exception a worker reported for a task, rebuilt on this side"""
+    if result.get("type") == "NoCoursesFound":
+        return NoCoursesFound(url)
+    return RuntimeError(result["error"])
+
+
+async def gather_tasks(batch: str, task_ids: List[int], on_result, task_id: str = None):
+    """Wait for queued tasks to finish, calling `on_result(task id, result)` as each one does.
+
+    The batch is removed from the queue on the way out, so cancelling the
+    wait also withdraws the tasks no worker has finished yet.
+    """
+    pending = set(task_ids)
+    waiting_since = time.monotonic()
+    try:
+        while pending:
+            finished = await asyncio.to_thread(task_queue.finished, pending)
+            if finished:
+                # Each result is read once, on the poll that first sees its task done
+                done = await asyncio.to_thread(task_queue.results, finished)
+                for finished_id in sorted(done):
+                    pending.discard(finished_id)
+                    on_result(finished_id, done[finished_id])
+            if not pending:
+                break
+            if time.monotonic() - waiting_since > TASK_QUEUE_LEASE and task_id:
+                if not await asyncio.to_thread(task_queue.workers_seen, TASK_QUEUE_LEASE):
+                    progress_store.update(task_id, message="Waiting for a scrape worker...")
+            await asyncio.sleep(TASK_QUEUE_POLL)
+    finally:
+        await asyncio.to_thread(task_queue.discard, batch)
+
+
+async def run_task(kind: str, payload: Dict, task_id: str = None) -> Dict:
+    """Run one task on a worker and return its result, raising the error it reported"""
+    batch = uuid.uuid4().hex
+    ids = await asyncio.to_thread(task_queue.enqueue, batch, kind, [payload])
+    results = {}
+    await gather_tasks(batch, ids, results.__setitem__, task_id)
+    result = results[ids[0]]
+    if "error" in result:
+        raise task_error(result, payload["url"])
+    return result
+
+
+async def queued_scrape_college(url: str, task_id: str = None, mode: str = "single_page",
+                                expand: str = "sequential", on_course=None, on_status=None,
+                                indices: list = None) -> list:
+    """scrape_college() carried out by workers through the task queue.
+
+    single_page is one task for the whole college; the per-course path (and
+    the fallback when single_page finds nothing) is a count task and then
+    one task per course, spread over every worker polling the queue.
+    """
+    if mode == "single_page":
+        progress_store.update(task_id, percentage=10, message="Loading course page...")
+        try:
+            result = await run_task("college", {"url": url, "expand": expand, "indices": indices}, task_id)
+        except Exception as e:
+            print(f"Single-page scrape failed: {type(e).__name__} - {e}")
+            result = {"courses": []}
+        if result["courses"]:
+            results = []
+            for index, tables in result["courses"]:
+                results.extend(tables)
+                if on_course:
+                    on_course(index, tables)
+            for status in result["statuses"]:
+                telemetry.count_course(status["status"])
+                if on_status:
+                    on_status(status)
+            return results
+        print("Single-page scrape returned no data, falling back to per-course scraping")
+
+    progress_store.update(task_id, current=0, percentage=10, message="Counting courses...")
+    total_buttons = (await run_task("count", {"url": url}, task_id))["total"]
+    if total_buttons == 0:
+        raise NoCoursesFound(url)
+
+    wanted = [i for i in (indices if indices is not None else range(total_buttons)) if i < total_buttons]
+    progress_store.update(
+        task_id,
+        total=len(wanted),
+        percentage=15,
+        message=f"Found {total_buttons} courses. Queued {len(wanted)} course tasks..."
+    )
+
+    batch = uuid.uuid4().hex
+    ids = await asyncio.to_thread(
+        task_queue.enqueue, batch, "course", [{"url": url, "index": index} for index in wanted]
+    )
+    index_of = dict(zip(ids, wanted))
+    results = []
+
+    def add_course(finished: int, result: Dict):
+        index = index_of[finished]
+        if "error" in result:
+            # The task itself was lost; scrape_single_course reports page failures in its status
+            tables, status = [], course_status(index, [], attempts=0, error=result["error"])
+        else:
+            tables, status = result["tables"], result["status"]
+        telemetry.count_course(status["status"])
+        results.extend(tables)
+        if on_course and tables:
+            on_course(index, tables)
+        if on_status:
+            on_status(status)
+        entry = progress_store.increment(task_id, "current")
+        if entry:
+            total = entry.get("total", 1) or 1
+            progress_store.update(
+                task_id,
+                message=f"Scraping course {entry['current']} of {total}...",
+                percentage=15 + int(entry["current"] / total * 50)
+            )
+
+    await gather_tasks(batch, ids, add_course, task_id)
+    return results
+
+
+# -------- INCREMENTAL REFRESH --------
+async def read_course_listing(url: str, pool: BrowserPool = None) -> list:
+    """[(name, listing hash)] for every course, from one load of the page without expanding anything"""
+    pool = pool or browser_pool
+
+    async def read():
+        async with pool.page() as page:
+            await open_url(page, url)
+            with telemetry.span("wait"):
+                block_selector = await page_selectors.resolve(page, "course_block", layout_key(url), READY_TIMEOUT)
+            if block_selector is None:
+                raise NoCoursesFound(url)
+            with telemetry.span("parse"):
+                listing = await page.locator(block_selector).evaluate_all(COURSE_LISTING_JS)
+        return [
+            (name or f"Course {i + 1}", content_hash(" ".join(text.split())))
+            for i, (name, text) in enumerate(listing)
+        ]
+
+    return await retry_policy.run(read, host_breakers.breaker(url), give_up=(NoCoursesFound,))
+
+
+def table_hashes(tables: list) -> list:
+    return [content_hash(rows) for table in tables for rows in table.values()]
+
+
+def listing_keys(listing: list) -> list:
+    """A stored-course key per listed course: its name, numbered from the second course of that name on"""
+    seen: Dict[str, int] = {}
+    keys = []
+    for name, _ in listing:
+        seen[name] = seen.get(name, 0) + 1
+        keys.append(name if seen[name] == 1 else f"{name} #{seen[name]}")
+    return keys
+
+
+async def incremental_scrape(slug: str, url: str, task_id: str = None, on_course=None, on_status=None,
+                             **options) -> list:
+    """Scrape only the courses that are new or changed since the stored results.
+
+    One unexpanded load of the courses page gives each course's name and a
+    hash of its listing text. If the whole listing matches what was stored,
+    nothing is scraped. Otherwise only the courses whose hash differs are
+    scraped, and the others keep their stored tables. Every status gets a
+    "change" of added, changed, unchanged, stale (scrape failed, stored data
+    kept) or removed, so course_status.json doubles as a diff.
+    """
+    stored = await asyncio.to_thread(result_cache.snapshot, slug)
+    known = stored["courses"] if stored else {}
+
+    progress_store.update(task_id, percentage=10, message="Checking the course list for changes...")
+    if task_queue is not None:
+        listing = [tuple(entry) for entry in (await run_task("listing", {"url": url}, task_id))["listing"]]
+    else:
+        async with options.get("limit") or asyncio.Semaphore(1):
+            listing = await read_course_listing(url, options.get("pool"))
+    listing_hash = content_hash([entry_hash for _, entry_hash in listing])
+    # Courses can share a name, so stored courses are keyed per listing position
+    keys = listing_keys(listing)
+
+    if stored and stored["listing_hash"] == listing_hash:
+        # Caches written before empty courses were stored can still lack some
+        stale = [i for i, key in enumerate(keys) if key not in known]
+    else:
+        stale = [
+            i for i, (key, (_, entry_hash)) in enumerate(zip(keys, listing))
+            if known.get(key, {}).get("listing_hash") != entry_hash
+        ]
+    print(f"Incremental refresh of {slug}: {len(stale)} of {len(listing)} courses new or changed")
+
+    for index, key in enumerate(keys):
+        if index not in stale and on_course and known[key]["entries"]:
+            on_course(index, known[key]["entries"])
+
+    scraped: Dict[int, list] = {}
+    attempted: Dict[int, Dict] = {}
+    if stale:
+        def add_scraped(index, tables):
+            scraped[index] = tables
+            if on_course:
+                on_course(index, tables)
+
+        await scrape_college(
+            url, task_id, on_course=add_scraped,
+            on_status=lambda status: attempted.__setitem__(status["index"], status),
+            indices=stale, **options
+        )
+
+    merged, statuses, courses, listing_hashes = [], [], [], {}
+    for index, (key, (name, entry_hash)) in enumerate(zip(keys, listing)):
+        before = known.get(key)
+        if index not in stale:
+            tables = before["entries"]
+            status = dict(course_status(index, tables, attempts=0), change="unchanged")
+        else:
+            tables = scraped.get(index, [])
+            status = attempted.get(index) or course_status(index, tables, attempts=0)
+            if status["status"] == "failed" and before:
+                tables = before["entries"]
+                status["change"] = "stale"
+            elif before is None:
+                status["change"] = "added"
+            else:
+                old, new = before["table_hashes"], table_hashes(tables)
+                changed = [k for k in range(max(len(old), len(new))) if old[k:k + 1] != new[k:k + 1]]
+                status["change"] = "changed" if changed else "unchanged"
+                if changed:
+                    status["tables_changed"] = changed
+        status["course"] = name
+        # A failed course keeps its old hash, so the next refresh tries it again
+        listing_hashes[key] = before["listing_hash"] if status.get("change") == "stale" else entry_hash
+        merged.extend(tables)
+        courses.append((key, tables))
+        statuses.append(status)
+
+    listed = set(keys)
+    for key in known:
+        if key not in listed:
+            statuses.append(dict(course_status(None, [], attempts=0), course=key, status="removed", change="removed"))
+
+    if not stale:
+        await asyncio.to_thread(result_cache.touch, slug)
+    elif merged:
+        complete = not failed_courses(statuses)
+        # Cache hits report the courses as they now are, not this refresh's diff
+        current = [
+            {key: value for key, value in status.items() if key not in ("change", "tables_changed")}
+            for status in statuses if status["status"] != "removed"
+        ]
+        await asyncio.to_thread(
+            result_cache.put, slug, merged, listing_hashes, listing_hash if complete else None, current, courses
+        )
+
+    if on_status:
+        for status in statuses:
+            on_status(status)
+    return merged
+
+
+# One in-flight scrape per college, shared by every request that asks for it
+scrape_flights = SingleFlight()
+# Courses of each in-flight scrape as they finish, for streaming readers
+course_feeds: Dict[str, CourseFeed] = {}
+# Task ids whose progress follows each in-flight scrape
+flight_followers: Dict[str, List[str]] = {}
+# Progress key of each in-flight scrape, unique to that scrape
+flight_keys: Dict[str, str] = {}
+
+
+async def coalesced_scrape(slug: str, url: str, task_id: str = None, incremental: bool = False,
+                           **options) -> tuple:
+    """Scrape a college, joining the scrape already running for it if there is one.
+
+    Returns (results, course statuses). The shared scrape reports progress
+    under its own key; each requester's task_id points at that same progress
+    entry while the scrape runs, and gets its own copy once it finishes.
+    Finished courses are published to course_feeds[slug] while the scrape
+    runs. Results with failed courses are not cached, so the next request
+    tries them again. With `incremental`, only new and changed courses are
+    scraped (see incremental_scrape).
+    """
+    if not scrape_flights.in_flight(slug):
+        # A cancelled scrape for the same college may still be cleaning up under its own key
+        flight_keys[slug] = f"flight:{slug}:{uuid.uuid4().hex}"
+        course_feeds[slug] = CourseFeed()
+        flight_followers[slug] = []
+        progress_store.set(flight_keys[slug], {
+            "status": "processing",
+            "percentage": 5,
+            "message": "Opening page...",
+            "current": 0,
+            "total": 0
+        })
+    else:
+        print(f"Joining in-flight scrape for: {slug} ({scrape_flights.waiters(slug)} waiting)")
+
+    # All None when the scrape being joined has just finished and only its result is left
+    flight_key = flight_keys.get(slug)
+    feed = course_feeds.get(slug)
+    followers = flight_followers.get(slug)
+    if task_id and followers is not None:
+        progress_store.link(task_id, flight_key)
+        followers.append(task_id)
+
+    async def run():
+        statuses = []
+        publish = lambda index, tables: feed.publish((index, tables))
+        try:
+            with telemetry.span("college", college=slug):
+                if incremental:
+                    # Stores its merged results itself, with the hashes it compared
+                    results = await incremental_scrape(
+                        slug, url, flight_key, on_course=publish, on_status=statuses.append, **options
+                    )
+                    return results, statuses
+
+                results = await scrape_college(
+                    url, flight_key, on_course=publish, on_status=statuses.append, **options
+                )
+                statuses.sort(key=lambda status: status["index"])
+                failed = failed_courses(statuses)
+                if results and not failed:
+                    await asyncio.to_thread(result_cache.put, slug, results, statuses=statuses)
+                elif failed:
+                    print(f"Not caching {slug}: {failed} courses failed")
+                return results, statuses
+        finally:
+            # Every follower keeps a copy of the final progress
+            for follower in followers:
+                progress_store.unlink(follower)
+            followers.clear()
+            progress_store.delete(flight_key)
+            feed.close()
+            if course_feeds.get(slug) is feed:
+                del course_feeds[slug]
+            if flight_followers.get(slug) is followers:
+                del flight_followers[slug]
+            if flight_keys.get(slug) == flight_key:
+                del flight_keys[slug]
+
+    try:
+        return await scrape_flights.do(slug, run)
+    finally:
+        if followers is not None and task_id in followers:
+            followers.remove(task_id)
+            progress_store.unlink(task_id)
+
+
+async def cancel_on_disconnect(request: Request, coro, interval: float = 0.5):
+    """Await `coro`, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+
+    async def watch():
+        while not task.done():
+            if await request.is_disconnected():
+                print("Client disconnected, cancelling scrape")
+                task.cancel()
+                return
+            await asyncio.sleep(interval)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        return await task
+    finally:
+        watcher.cancel()
+
+
 @app.get("/", response_class=HTMLResponse)
 def home():
     return open("templates/index.html", encoding="utf-8").read()
 
 @app.get("/colleges")
-def get_colleges():
-    return list(COLLEGE_LINKS.keys())
+def get_colleges(
+    request: Request,
+    q: str = Query(""),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=1000)
+):
+    """Search colleges by name, slug or abbreviation ("IITB"), a page at a time.
+
+    Responses carry an ETag derived from the catalog version and the query,
+    so clients revalidating an unchanged search get a 304.
+    """
+    # Pick up file changes first, so the ETag matches the catalog being searched
+    college_catalog.refresh()
+    etag = '"' + content_hash([college_catalog.version, q, offset, limit]) + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    total, items = college_catalog.search(q, offset=offset, limit=limit)
+    return JSONResponse({"total": total, "offset": offset, "limit": limit, "items": items}, headers=headers)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    stats = result_cache.stats()
+    lines = [
+        "# HELP scrape_cache_hits_total Scrapes served from the result cache",
+        "# TYPE scrape_cache_hits_total counter",
+        f"scrape_cache_hits_total {stats['hits']}",
+        "# HELP scrape_cache_misses_total Scrapes that were not in the result cache",
+        "# TYPE scrape_cache_misses_total counter",
+        f"scrape_cache_misses_total {stats['misses']}",
+        "# HELP scrape_cache_stores_total Scrape results written to the result cache",
+        "# TYPE scrape_cache_stores_total counter",
+        f"scrape_cache_stores_total {stats['stores']}",
+        "# HELP scrape_cache_evictions_total Colleges evicted from the result cache",
+        "# TYPE scrape_cache_evictions_total counter",
+        f"scrape_cache_evictions_total {stats['evictions']}",
+        "# HELP scrape_cache_entries Colleges currently in the result cache",
+        "# TYPE scrape_cache_entries gauge",
+        f"scrape_cache_entries {stats['entries']}",
+        "# HELP scrape_cache_bytes Size of the cached result data",
+        "# TYPE scrape_cache_bytes gauge",
+        f"scrape_cache_bytes {stats['bytes']}",
+        "# HELP college_catalog_entries Colleges in the loaded college catalog",
+        "# TYPE college_catalog_entries gauge",
+        f"college_catalog_entries {len(college_catalog)}",
+        "# HELP college_catalog_loads_total Times the college catalog file was loaded",
+        "# TYPE college_catalog_loads_total counter",
+        f"college_catalog_loads_total {college_catalog.loads}",
+        "# HELP scrape_requests_allowed_total Page requests let through by the request policy",
+        "# TYPE scrape_requests_allowed_total counter",
+        f"scrape_requests_allowed_total {request_policy.allowed}",
+        "# HELP scrape_requests_blocked_total Page requests blocked by the request policy",
+        "# TYPE scrape_requests_blocked_total counter",
+    ]
+    for reason, count in sorted(request_policy.blocked.items()):
+        lines.append(f'scrape_requests_blocked_total{{reason="{reason}"}} {count}')
+    lines += [
+        "# HELP scrape_selector_resolved_total Elements found by one of their selectors",
+        "# TYPE scrape_selector_resolved_total counter",
+        f"scrape_selector_resolved_total {page_selectors.resolved}",
+        "# HELP scrape_selector_fallbacks_total Elements found only by a fallback selector",
+        "# TYPE scrape_selector_fallbacks_total counter",
+        f"scrape_selector_fallbacks_total {page_selectors.fallbacks}",
+        "# HELP scrape_selector_misses_total Waits where no selector for an element matched in time",
+        "# TYPE scrape_selector_misses_total counter",
+        f"scrape_selector_misses_total {page_selectors.misses}",
+        "# HELP scrape_retries_total Page attempts retried after a failure",
+        "# TYPE scrape_retries_total counter",
+        f"scrape_retries_total {retry_policy.retries}",
+        "# HELP scrape_retries_exhausted_total Page work that failed every attempt",
+        "# TYPE scrape_retries_exhausted_total counter",
+        f"scrape_retries_exhausted_total {retry_policy.exhausted}",
+        "# HELP scrape_breaker_trips_total Times a host's circuit breaker opened",
+        "# TYPE scrape_breaker_trips_total counter",
+    ]
+    breakers = sorted(host_breakers.stats().items())
+    for host, breaker in breakers:
+        lines.append(f'scrape_breaker_trips_total{{host="{host}"}} {breaker["trips"]}')
+    lines += [
+        "# HELP scrape_breaker_open Whether a host's circuit breaker is pausing new work",
+        "# TYPE scrape_breaker_open gauge",
+    ]
+    for host, breaker in breakers:
+        lines.append(f'scrape_breaker_open{{host="{host}"}} {int(breaker["state"] != "closed")}')
+    if task_queue is not None:
+        queued = task_queue.stats()
+        lines += [
+            "# HELP scrape_queue_tasks Tasks in the scrape task queue, by state",
+            "# TYPE scrape_queue_tasks gauge",
+        ]
+        for state, count in sorted(queued.items()):
+            lines.append(f'scrape_queue_tasks{{state="{state}"}} {count}')
+        lines += [
+            "# HELP scrape_queue_workers Workers that polled the task queue within one lease",
+            "# TYPE scrape_queue_workers gauge",
+            f"scrape_queue_workers {task_queue.workers_seen(TASK_QUEUE_LEASE)}",
+        ]
+    lines += [
+        "# HELP scrape_jobs_queued Background jobs waiting for a job worker",
+        "# TYPE scrape_jobs_queued gauge",
+        f"scrape_jobs_queued {job_queue.queued}",
+        "# HELP scrape_jobs_running Background jobs being scraped",
+        "# TYPE scrape_jobs_running gauge",
+        f"scrape_jobs_running {job_queue.running}",
+    ]
+    pool = browser_pool.stats()
+    lines += [
+        "# HELP browser_pool_browsers Chromium browsers running in the pool",
+        "# TYPE browser_pool_browsers gauge",
+        f"browser_pool_browsers {pool['browsers']}",
+        "# HELP browser_pool_active_pages Pages currently open across the pool",
+        "# TYPE browser_pool_active_pages gauge",
+        f"browser_pool_active_pages {pool['active_pages']}",
+        "# HELP browser_pool_launches_total Browsers launched, including replacements",
+        "# TYPE browser_pool_launches_total counter",
+        f"browser_pool_launches_total {pool['launches']}",
+        "# HELP browser_pool_recycles_total Browsers retired after BROWSER_POOL_MAX_USES pages or a crash",
+        "# TYPE browser_pool_recycles_total counter",
+        f"browser_pool_recycles_total {pool['recycles']}",
+        "# HELP browser_pool_pages_served_total Pages handed out by the pool",
+        "# TYPE browser_pool_pages_served_total counter",
+        f"browser_pool_pages_served_total {pool['pages_served']}",
+    ]
+    lines += telemetry.prometheus()
+    return "\n".join(lines) + "\n"
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """A profile written by a profile=true scrape"""
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    if not re.fullmatch(r"[0-9a-f]{32}", profile_id) or not os.path.exists(path):
+        return JSONResponse({"error": "Profile not found"}, status_code=404)
+    with open(path, encoding="utf-8") as f:
+        return JSONResponse(json.load(f))
+
 
 @app.get("/progress/{task_id}")
 def get_progress(task_id: str):
-    if task_id in progress_store:
-        return progress_store[task_id]
+    entry = progress_store.get(task_id)
+    if entry is not None:
+        return entry
     return {"status": "not_found", "percentage": 0, "message": "Task not found"}
 
-# -------- HELPER FUNCTION (NOT API ROUTE) --------
-async def scrape_table(context, url, index, task_id: str = None, total: int = 0):
-    page = await context.new_page()
+@app.get("/progress/{task_id}/events")
+async def progress_events(task_id: str):
+    """Push progress updates as Server-Sent Events until the task finishes"""
+    async def events():
+        found = False
+        async for entry in progress_store.watch(task_id):
+            if entry is None:
+                # Keep proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            found = True
+            yield f"data: {json.dumps(entry, ensure_ascii=False)}\n\n"
+        if not found:
+            not_found = {"status": "not_found", "percentage": 0, "message": "Task not found"}
+            yield f"data: {json.dumps(not_found)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def course_csv_name(safe_name: str, course_name: str, idx: int) -> str:
+    """CSV file name for the idx-th table, kept under 100 characters"""
+    # Sanitize course name (max 60 chars) and ensure total path stays under limit
+    safe_course = sanitize_filename(course_name, max_length=60)
+    # Use shorter format: college_course_idx.csv (max total ~150 chars including path)
+    csv_name = f"{safe_name}_{safe_course}_{idx+1}.csv"
+
+    # Final safety check - truncate if still too long
+    if len(csv_name) > 100:
+        # Keep college name, truncate course name more aggressively
+        remaining = 100 - len(safe_name) - len(str(idx+1)) - 7  # 7 for "_" and ".csv"
+        safe_course = sanitize_filename(course_name, max_length=max(10, remaining))
+        csv_name = f"{safe_name}_{safe_course}_{idx+1}.csv"
+    return csv_name
+
+
+def college_csv_files(college: str, results: list, folder: str = "", statuses: list = None,
+                      profile: Profile = None):
+    """Yield (arcname, csv chunks) for every non-empty course table of a college.
+
+    With `statuses`, course_status.json reports the outcome of every course.
+    Encoding each table is timed as a "csv" span, recorded in `profile` if given.
+    """
+    # Sanitize college name (max 50 chars to leave room for course names)
+    safe_name = sanitize_filename(college, max_length=50)
+    for idx, table_data in enumerate(results):
+        for course_name, rows in table_data.items():
+            if rows:
+                chunks = telemetry.timed(csv_chunks(rows), "csv", profile, college=college, course=course_name)
+                yield folder + course_csv_name(safe_name, course_name, idx), chunks
+    if statuses is not None:
+        yield folder + "course_status.json", [json.dumps(statuses, indent=2, ensure_ascii=False).encode("utf-8")]
+
+
+def cached_course_statuses(results: list) -> list:
+    """Course statuses rebuilt from cached results, for entries stored without their statuses"""
+    return [course_status(index, tables) for index, tables in group_courses(results)]
+
+
+async def cached_scrape(slug: str) -> tuple:
+    """(results, course statuses) from the result cache, or (None, None) on a miss"""
+    found = await asyncio.to_thread(result_cache.lookup, slug)
+    if not found:
+        return None, None
+    results, statuses = found
+    return results, statuses or cached_course_statuses(results)
+
+
+def failed_courses(statuses: list) -> int:
+    return sum(1 for status in statuses if status["status"] == "failed")
+
+
+def ready_message(statuses: list) -> str:
+    message = "Download ready!"
+    changes: Dict[str, int] = {}
+    for status in statuses:
+        if "change" in status:
+            changes[status["change"]] = changes.get(status["change"], 0) + 1
+    if changes:
+        message += " " + ", ".join(f"{count} {change}" for change, count in sorted(changes.items())) + "."
+    failed = failed_courses(statuses)
+    if failed:
+        message += f" {failed} of {len(statuses)} courses failed, see course_status.json."
+    return message
+
+
+def zip_filename_for(college: str) -> str:
+    return f"{sanitize_filename(college, max_length=50)}_fees.zip"
+
+
+def zip_response(files, filename: str, on_done=None, profile: Profile = None,
+                 headers: Dict = None) -> StreamingResponse:
+    """Stream a ZIP of `files` as it is compressed; `on_done` runs once it has been sent.
+
+    Building the archive is timed as a "zip" span, which includes pulling
+    the CSV chunks it compresses.
+    """
+    def body():
+        yield from telemetry.timed(stream_zip(files), "zip", profile)
+        if on_done:
+            on_done()
+
+    return StreamingResponse(
+        body(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **(headers or {})}
+    )
+
+def dataset_response(college: str, results: list, format: str, on_done=None, profile: Profile = None,
+                     headers: Dict = None) -> StreamingResponse:
+    """Stream a college's results as one long-format fee table in `format` (see DATASET_FORMATS)"""
+    encode, media_type, extension = DATASET_FORMATS[format]
+
+    def encoded():
+        table = FeeTable()
+        table.add(college, results)
+        yield from encode(table)
+
+    def body():
+        yield from telemetry.timed(encoded(), "export", profile, format=format)
+        if on_done:
+            on_done()
+
+    filename = f"{sanitize_filename(college, max_length=50)}_fees.{extension}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **(headers or {})}
+    )
+
+
+def dump_profile(profile: Profile, profile_id: str):
+    """Write a request's spans to PROFILE_DIR/<profile_id>.json"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile.as_dict(), f, indent=2, ensure_ascii=False)
+    totals = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in sorted(profile.totals().items()))
+    print(f"Profile written to {path}: {totals}")
+
+
+def profile_headers(profile: Profile, profile_id: str) -> Dict:
+    """Server-Timing for the phases finished before the response starts, and where the full profile goes"""
+    timing = ", ".join(
+        f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in sorted(profile.totals().items())
+    )
+    return {"Server-Timing": timing, "X-Profile-Id": profile_id}
+
+# -------- BACKGROUND JOBS --------
+async def run_job(job: Job):
+    """Scrape a queued job's college and leave the ZIP on the job for download"""
+    if "colleges" in job.options:
+        return await run_bulk_job(job)
+
+    progress_store.set(job.id, {
+        "status": "processing",
+        "percentage": 0,
+        "message": "Initializing...",
+        "current": 0,
+        "total": 0
+    })
     try:
-        if task_id and task_id in progress_store:
-            progress_store[task_id]["current"] = index + 1
-            progress_store[task_id]["message"] = f"Scraping course {index + 1} of {total}..."
-            progress_store[task_id]["percentage"] = int((index + 1) / total * 60)  # 60% for scraping
-        
-        await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        data_list = []
+        slug = college_slug(job.college)
+        url = BASE_URL + college_catalog[job.college].strip() + "/courses-fees"
 
-        button = page.locator(
-            "span[class='jsx-3955509628 icon icon-20 clg-sprite arrow-d-blue-20 mr-1 ']"
-        ).nth(index)
-        await button.scroll_into_view_if_needed()
-        await button.click()
+        results = None
+        if not job.options.get("force_refresh") and not job.options.get("incremental"):
+            results, statuses = await cached_scrape(slug)
+        if not results:
+            results, statuses = await coalesced_scrape(
+                slug, url, job.id,
+                incremental=job.options.get("incremental", False),
+                mode=job.options.get("mode", "single_page"),
+                expand=job.options.get("expand", "sequential"),
+                concurrency=job.options.get("concurrency"),
+            )
+        if not results:
+            raise RuntimeError("No data found after scraping")
+
+        job.report = statuses
+        job.artifact = lambda: college_csv_files(job.college, results, statuses=statuses)
+        job.result_name = zip_filename_for(job.college)
+
+        progress_store.update(job.id, percentage=100, status="completed", message=ready_message(statuses))
+    except NoCoursesFound:
+        progress_store.update(
+            job.id,
+            status="error",
+            message="No courses found on the page. Please check the college URL or try another college."
+        )
+        raise
+    except Exception as e:
+        progress_store.update(job.id, status="error", message=f"Scraping error ({type(e).__name__}): {e}")
+        raise
+    except asyncio.CancelledError:
+        progress_store.update(job.id, status="cancelled", message="Job cancelled")
+        raise
 
-        await page.wait_for_timeout(3000)
 
-        html = await page.content()
-        soup = BeautifulSoup(html, 'html.parser')
+async def run_bulk_job(job: Job):
+    """Scrape many colleges on one shared page budget into a single ZIP.
+
+    Every college gets a folder of CSVs in the archive, and report.json
+    lists the outcome for each college so partial failures are visible.
+    """
+    colleges = job.options["colleges"]
+    total = len(colleges)
+    progress_store.set(job.id, {
+        "status": "processing",
+        "percentage": 0,
+        "message": f"Scraping {total} colleges...",
+        "current": 0,
+        "total": total
+    })
+    budget = asyncio.Semaphore(max(1, job.options.get("concurrency") or browser_pool.max_pages))
+
+    async def scrape_one(college):
+        entry = {"college": college, "status": "ok", "courses": 0, "failed_courses": 0, "tables": 0, "error": None}
+        results = None
+        statuses = None
+        try:
+            if college not in college_catalog:
+                entry["status"] = "not_found"
+                return entry, None, None
+            slug = college_slug(college)
+            url = BASE_URL + college_catalog[college].strip() + "/courses-fees"
+            if not job.options.get("force_refresh") and not job.options.get("incremental"):
+                results, statuses = await cached_scrape(slug)
+            if not results:
+                results, statuses = await coalesced_scrape(
+                    slug, url,
+                    incremental=job.options.get("incremental", False),
+                    mode=job.options.get("mode", "single_page"),
+                    expand=job.options.get("expand", "sequential"),
+                    limit=budget,
+                )
+            entry["failed_courses"] = failed_courses(statuses)
+            if results:
+                entry["courses"] = len({name for table in results for name in table})
+                entry["tables"] = len(results)
+                if entry["failed_courses"]:
+                    entry["status"] = "partial"
+            else:
+                entry["status"] = "empty"
+        except NoCoursesFound:
+            entry["status"] = "no_courses"
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = f"{type(e).__name__}: {e}"
+            print(f"Bulk scrape failed for {college}: {entry['error']}")
+        finally:
+            entry_progress = progress_store.increment(job.id, "current")
+            if entry_progress:
+                done = entry_progress["current"]
+                progress_store.update(
+                    job.id,
+                    percentage=int(done / total * 90),
+                    message=f"Scraped {done} of {total} colleges..."
+                )
+        return entry, results, statuses
 
-        tables = soup.find_all('table', class_="jsx-2530098677 table-new table-responsive")
+    outcomes = await asyncio.gather(*(scrape_one(college) for college in colleges))
+    job.report = [entry for entry, _, _ in outcomes]
 
-        block = page.locator(
-            'div[class="jsx-3955509628 course-detail d-flex justify-content-between"]'
-        ).nth(index)
-        name = await block.locator('a').inner_text()
+    def archive_files():
+        for entry, results, statuses in outcomes:
+            if results:
+                folder = sanitize_filename(entry["college"], max_length=50) + "/"
+                yield from college_csv_files(entry["college"], results, folder, statuses)
+        yield "report.json", [json.dumps(job.report, indent=2, ensure_ascii=False).encode("utf-8")]
 
-        for table in tables:
-            header = [i.text.strip() for i in table.find('tr').find_all('th')]
-            data = []
-            for row in table.find_all('tr')[1:]:
-                cells = row.find_all('td')
-                if not cells:
+    job.artifact = archive_files
+    job.result_name = f"bulk_{len(colleges)}_colleges_fees.zip"
+
+    succeeded = sum(1 for entry in job.report if entry["status"] == "ok")
+    progress_store.update(
+        job.id,
+        percentage=100,
+        status="completed",
+        message=f"Download ready! {succeeded} of {total} colleges scraped."
+    )
+
+
+job_queue = JobQueue(
+    run_job,
+    workers=int(os.environ.get("JOB_WORKERS", "2")),
+    max_queued=int(os.environ.get("JOB_QUEUE_SIZE", "100")),
+    ttl=FINISHED_TTL,
+)
+
+
+async def expire_finished(interval: float = 30):
+    """Drop finished jobs, their ZIPs and stale progress entries after FINISHED_TTL"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            for job in job_queue.expire():
+                progress_store.delete(job.id)
+
+            now = time.time()
+            for task_id, entry in progress_store.entries():
+                if entry.get("status") not in FINISHED_STATUSES:
                     continue
-                row_data = [clean_cell_text(cell.text.strip()) for cell in cells]
-                data.append(dict(zip(header, row_data)))
+                if "finished_at" not in entry:
+                    progress_store.update(task_id, finished_at=now)
+                elif now - entry["finished_at"] > FINISHED_TTL:
+                    progress_store.delete(task_id)
+        except Exception as e:
+            print("Expiry error:", e)
 
-            data_list.append({name: data})
 
-        return data_list
-    except Exception as e:
-        print(f"Error scraping table {index + 1}: {e}")
-        return []
-    finally:
-        await page.close()
+class JobRequest(BaseModel):
+    college: str
+    priority: int = 0
+    user: Optional[str] = None
+    mode: Literal["single_page", "per_course"] = "single_page"
+    expand: Literal["sequential", "all"] = "sequential"
+    concurrency: Optional[int] = Field(None, ge=1, le=20)
+    force_refresh: bool = False
+    incremental: bool = False
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(job_request: JobRequest, request: Request):
+    college = college_catalog.resolve(job_request.college)
+    if college is None:
+        return JSONResponse({"error": "College not found"}, status_code=404)
+
+    user = job_request.user or (request.client.host if request.client else "anonymous")
+    job = Job(
+        college,
+        user,
+        priority=job_request.priority,
+        options={
+            "mode": job_request.mode,
+            "expand": job_request.expand,
+            "concurrency": job_request.concurrency,
+            "force_refresh": job_request.force_refresh,
+            "incremental": job_request.incremental,
+        },
+    )
+    try:
+        await job_queue.submit(job)
+    except asyncio.QueueFull:
+        return JSONResponse({"error": "Too many queued jobs, try again later"}, status_code=429)
+
+    return {"id": job.id, "status": job.status, "position": job_queue.position(job)}
+
+
+class BulkRequest(BaseModel):
+    colleges: List[str] = []
+    match: Optional[str] = None
+    limit: Optional[int] = None
+    priority: int = 0
+    user: Optional[str] = None
+    mode: Literal["single_page", "per_course"] = "single_page"
+    expand: Literal["sequential", "all"] = "sequential"
+    concurrency: Optional[int] = Field(None, ge=1, le=20)
+    force_refresh: bool = False
+    incremental: bool = False
+
+
+@app.post("/bulk", status_code=202)
+async def submit_bulk(bulk_request: BulkRequest, request: Request):
+    """Queue one job that scrapes a list of colleges and/or every college matching `match`"""
+    colleges = list(dict.fromkeys(college_catalog.resolve(name) or name for name in bulk_request.colleges))
+    if bulk_request.match:
+        needle = bulk_request.match.lower()
+        colleges += [name for name in college_catalog if needle in name.lower() and name not in colleges]
+    if bulk_request.limit:
+        colleges = colleges[:bulk_request.limit]
+    if not colleges:
+        return JSONResponse({"error": "No colleges selected"}, status_code=400)
+
+    user = bulk_request.user or (request.client.host if request.client else "anonymous")
+    job = Job(
+        f"{len(colleges)} colleges",
+        user,
+        priority=bulk_request.priority,
+        options={
+            "colleges": colleges,
+            "mode": bulk_request.mode,
+            "expand": bulk_request.expand,
+            "concurrency": bulk_request.concurrency,
+            "force_refresh": bulk_request.force_refresh,
+            "incremental": bulk_request.incremental,
+        },
+    )
+    try:
+        await job_queue.submit(job)
+    except asyncio.QueueFull:
+        return JSONResponse({"error": "Too many queued jobs, try again later"}, status_code=429)
+
+    return {"id": job.id, "status": job.status, "colleges": len(colleges), "position": job_queue.position(job)}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+
+    status = job.to_dict()
+    progress = progress_store.get(job.id) or {}
+    status["percentage"] = progress.get("percentage", 100 if job.status == "completed" else 0)
+    status["message"] = progress.get("message", "")
+    status["position"] = job_queue.position(job)
+    return status
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    if job.status != "completed" or job.artifact is None:
+        return JSONResponse({"error": f"Job is {job.status}, no result available"}, status_code=409)
+
+    return zip_response(job.artifact(), job.result_name)
+
+
+def group_courses(results: list):
+    """Yield (index, tables) for each course in a flat list of {course: rows} tables"""
+    index, current, tables = -1, None, []
+    for table in results:
+        name = next(iter(table))
+        if name != current and tables:
+            yield index, tables
+            tables = []
+        if name != current:
+            index, current = index + 1, name
+        tables.append(table)
+    if tables:
+        yield index, tables
+
+
+def course_event(index: int, tables: list) -> Dict:
+    return {
+        "type": "course",
+        "index": index,
+        "course": next(iter(tables[0])),
+        "tables": [rows for table in tables for rows in table.values()],
+    }
+
+
+@app.get("/scrape/stream")
+async def scrape_stream(
+    college: str = Query(...),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    mode: str = Query("single_page", pattern="^(single_page|per_course)$"),
+    expand: str = Query("sequential", pattern="^(sequential|all)$"),
+    concurrency: int = Query(None, ge=1, le=20),
+    force_refresh: bool = Query(False),
+    incremental: bool = Query(False)
+):
+    """Stream each course's tables as soon as it is scraped, as NDJSON or Server-Sent Events"""
+    college = college_catalog.resolve(college)
+    if college is None:
+        return JSONResponse({"error": "College not found"}, status_code=404)
+
+    slug = college_slug(college)
+    url = BASE_URL + college_catalog[college].strip() + "/courses-fees"
+    cached = cached_statuses = None
+    if not force_refresh and not incremental:
+        cached, cached_statuses = await cached_scrape(slug)
+
+    def encode(event: Dict) -> str:
+        data = json.dumps(event, ensure_ascii=False)
+        if format == "sse":
+            return f"event: {event['type']}\ndata: {data}\n\n"
+        return data + "\n"
+
+    async def events():
+        yield encode({"type": "start", "college": college, "cached": bool(cached)})
+        if cached:
+            # Report each course under the index it had when it was scraped
+            scraped_index = {status["course"]: status["index"] for status in cached_statuses}
+            for index, tables in group_courses(cached):
+                yield encode(course_event(scraped_index.get(next(iter(tables[0])), index), tables))
+            yield encode({"type": "done", "tables": len(cached), "courses": cached_statuses})
+            return
+
+        task = asyncio.create_task(
+            coalesced_scrape(
+                slug, url, incremental=incremental, mode=mode, expand=expand, concurrency=concurrency
+            )
+        )
+        try:
+            # Let the scrape start (or join a running one) so its feed exists
+            await asyncio.sleep(0)
+            feed = course_feeds.get(slug)
+            if feed:
+                async for index, tables in feed.follow():
+                    yield encode(course_event(index, tables))
+            results, statuses = await task
+            if results:
+                yield encode({"type": "done", "tables": len(results), "courses": statuses})
+            else:
+                yield encode({"type": "error", "error": "No data found after scraping"})
+        except NoCoursesFound:
+            yield encode({"type": "error", "error": "No courses found on the page. The page structure may have changed or this college may not have course information available."})
+        except Exception as e:
+            print(f"Streaming scrape error: {type(e).__name__} - {e}")
+            yield encode({"type": "error", "error": f"Scraping error ({type(e).__name__}): {e}"})
+        finally:
+            # Client went away or the stream ended early: stop waiting on the scrape
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 # -------- API ROUTE --------
 @app.get("/scrape")
 async def scrape(
-    background_tasks: BackgroundTasks,
+    request: Request,
     college: str = Query(...),
-    task_id: str = Query(None)
+    task_id: str = Query(None),
+    mode: str = Query("single_page", pattern="^(single_page|per_course)$"),
+    expand: str = Query("sequential", pattern="^(sequential|all)$"),
+    concurrency: int = Query(None, ge=1, le=20),
+    force_refresh: bool = Query(False),
+    incremental: bool = Query(False),
+    format: str = Query("zip", pattern="^(zip|jsonl|xlsx|parquet|arrow)$"),
+    profile: bool = Query(False)
 ):
+    request_profile = telemetry.start_profile() if profile else None
+    profile_id = uuid.uuid4().hex
     try:
-        if college not in COLLEGE_LINKS:
+        if not format_available(format):
+            return JSONResponse({"error": f"format={format} needs pyarrow installed on the server"}, status_code=400)
+
+        college = college_catalog.resolve(college) or college
+        if college not in college_catalog:
             error_msg = "College not found"
             if task_id:
-                progress_store[task_id] = {
+                progress_store.set(task_id, {
                     "status": "error",
                     "percentage": 0,
                     "message": error_msg
-                }
+                })
             return JSONResponse({"error": error_msg}, status_code=404)
 
         # Initialize progress if task_id provided
         if task_id:
-            progress_store[task_id] = {
+            progress_store.set(task_id, {
                 "status": "processing",
                 "percentage": 0,
                 "message": "Initializing...",
                 "current": 0,
                 "total": 0
-            }
+            })
 
-        relative_url = COLLEGE_LINKS[college]
-        url = "https://collegedunia.com" + relative_url.strip() + "/courses-fees"
+        relative_url = college_catalog[college]
+        url = BASE_URL + relative_url.strip() + "/courses-fees"
 
-        if task_id and task_id in progress_store:
-            progress_store[task_id]["percentage"] = 5
-            progress_store[task_id]["message"] = "Opening browser..."
+        progress_store.update(task_id, percentage=5, message="Opening page...")
 
-        # Helper function to scrape a single course (runs in parallel)
-        def scrape_single_course(index, url, task_id):
-            browser = None
-            page = None
-            try:
-                playwright = sync_playwright().start()
-                try:
-                    browser = playwright.chromium.launch(headless=True)
-                    context = browser.new_context()
-                    page = context.new_page()
-                    page.goto(url, timeout=60000)
-                    page.wait_for_load_state("load")
-                    
-                    button = page.locator(
-                        "span[class='jsx-3955509628 icon icon-20 clg-sprite arrow-d-blue-20 mr-1 ']"
-                    ).nth(index)
-                    button.scroll_into_view_if_needed()
-                    button.click()
-                    page.wait_for_timeout(3000)
-                    
-                    html = page.content()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    tables = soup.find_all('table', class_="jsx-2530098677 table-new table-responsive")
-                    
-                    block = page.locator(
-                        'div[class="jsx-3955509628 course-detail d-flex justify-content-between"]'
-                    ).nth(index)
-                    name = block.locator('a').inner_text()
-                    
-                    data_list = []
-                    for table in tables:
-                        header = [th.text.strip() for th in table.find('tr').find_all('th')]
-                        data = []
-                        for row in table.find_all('tr')[1:]:
-                            cells = row.find_all('td')
-                            if not cells:
-                                continue
-                            row_data = [clean_cell_text(cell.text.strip()) for cell in cells]
-                            data.append(dict(zip(header, row_data)))
-                        data_list.append({name: data})
-                    
-                    # Update progress
-                    if task_id and task_id in progress_store:
-                        progress_store[task_id]["current"] = index + 1
-                        total = progress_store[task_id].get("total", 1)
-                        progress_store[task_id]["message"] = f"Scraping course {index + 1} of {total}..."
-                        progress_store[task_id]["percentage"] = 15 + int((index + 1) / total * 50)  # 15-65% for scraping
-                    
-                    return data_list
-                finally:
-                    # Clean up resources
-                    if page:
-                        try:
-                            page.close()
-                        except:
-                            pass
-                    if browser:
-                        try:
-                            browser.close()
-                        except:
-                            pass
-                    try:
-                        playwright.stop()
-                    except:
-                        pass
-            except Exception as e:
-                print(f"Error scraping table {index + 1}: {e}")
-                import traceback
-                traceback.print_exc()
-                return []
-        
-        # Use sync playwright in a thread to get total count
-        def get_total_courses():
-            browser = None
-            page = None
+        slug = college_slug(college)
+        results = None
+        if not force_refresh and not incremental:
+            results, statuses = await cached_scrape(slug)
+
+        if results:
+            print(f"Serving cached results for: {college}")
+            progress_store.update(task_id, percentage=65, message="Loaded cached results...")
+        else:
             try:
-                playwright = sync_playwright().start()
-                try:
-                    browser = playwright.chromium.launch(headless=True)
-                    context = browser.new_context()
-                    page = context.new_page()
-                    page.goto(url, timeout=60000)
-                    page.wait_for_load_state("networkidle", timeout=30000)
-                    # Wait a bit more for dynamic content
-                    page.wait_for_timeout(3000)
-                    
-                    # Try multiple selectors to find course buttons
-                    selectors = [
-                        "span[class='jsx-3955509628 icon icon-20 clg-sprite arrow-d-blue-20 mr-1 ']",
-                        "span.icon-20.clg-sprite.arrow-d-blue-20",
-                        "span.arrow-d-blue-20",
-                        "button[aria-expanded='false']",
-                        ".course-detail"
-                    ]
-                    
-                    total_buttons = 0
-                    for selector in selectors:
-                        try:
-                            count = page.locator(selector).count()
-                            if count > 0:
-                                total_buttons = count
-                                print(f"Found {total_buttons} courses using selector: {selector}")
-                                break
-                        except Exception as e:
-                            print(f"Selector {selector} failed: {e}")
-                            continue
-                    
-                    # If still 0, try to find course detail divs
-                    if total_buttons == 0:
-                        try:
-                            course_divs = page.locator('div[class*="course-detail"]').count()
-                            if course_divs > 0:
-                                total_buttons = course_divs
-                                print(f"Found {total_buttons} courses using course-detail divs")
-                        except:
-                            pass
-                    
-                    # Debug: Print page title and URL
-                    print(f"Page URL: {page.url}")
-                    print(f"Page title: {page.title()}")
-                    
-                    return total_buttons
-                finally:
-                    # Clean up resources
-                    if page:
-                        try:
-                            page.close()
-                        except:
-                            pass
-                    if browser:
-                        try:
-                            browser.close()
-                        except:
-                            pass
-                    try:
-                        playwright.stop()
-                    except:
-                        pass
-            except Exception as e:
-                print(f"Error getting total courses: {e}")
-                import traceback
-                traceback.print_exc()
-                return 0
-        
-        try:
-            if task_id and task_id in progress_store:
-                progress_store[task_id]["percentage"] = 10
-                progress_store[task_id]["message"] = "Counting courses..."
-            
-            # Get total number of courses
-            total_buttons = await asyncio.to_thread(get_total_courses)
-            
-            if total_buttons == 0:
-                error_msg = f"No courses found on the page. The page structure may have changed or the college may not have course information available. URL: {url}"
+                results, statuses = await cancel_on_disconnect(
+                    request,
+                    coalesced_scrape(
+                        slug, url, task_id, incremental=incremental,
+                        mode=mode, expand=expand, concurrency=concurrency
+                    )
+                )
+
+                progress_store.update(task_id, percentage=65, message="Processing scraped data...")
+                
+            except NoCoursesFound:
                 print(f"DEBUG: No courses found for college: {college}")
                 print(f"DEBUG: URL attempted: {url}")
-                if task_id and task_id in progress_store:
-                    progress_store[task_id]["status"] = "error"
-                    progress_store[task_id]["message"] = "No courses found on the page. Please check the college URL or try another college."
+                progress_store.update(
+                    task_id,
+                    status="error",
+                    message="No courses found on the page. Please check the college URL or try another college."
+                )
                 return JSONResponse({"error": "No courses found on the page. The page structure may have changed or this college may not have course information available."}, status_code=404)
-            
-            if task_id and task_id in progress_store:
-                progress_store[task_id]["total"] = total_buttons
-                progress_store[task_id]["percentage"] = 15
-                progress_store[task_id]["message"] = f"Found {total_buttons} courses. Starting parallel scraping..."
-            
-            # Run parallel scraping with ThreadPoolExecutor
-            # Use max 5 concurrent tabs to avoid overwhelming the system
-            max_workers = min(5, total_buttons)
-            
-            def run_parallel_scrape():
-                with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    # Submit all scraping tasks
-                    futures = [
-                        executor.submit(scrape_single_course, i, url, task_id) 
-                        for i in range(total_buttons)
-                    ]
-                    
-                    # Collect results as they complete
-                    results = []
-                    for future in concurrent.futures.as_completed(futures):
-                        try:
-                            result = future.result()
-                            results.extend(result)
-                        except Exception as e:
-                            print(f"Error in parallel scraping: {e}")
-                    
-                    return results
-            
-            # Run parallel scraping in a thread
-            results = await asyncio.to_thread(run_parallel_scrape)
-            
-            if task_id and task_id in progress_store:
-                progress_store[task_id]["percentage"] = 65
-                progress_store[task_id]["message"] = "Processing scraped data..."
-                
-        except Exception as e:
-            error_type = type(e).__name__
-            error_details = str(e) if str(e) else "No error message available"
-            error_msg = f"Scraping error ({error_type}): {error_details}"
-            if task_id and task_id in progress_store:
-                progress_store[task_id]["status"] = "error"
-                progress_store[task_id]["message"] = error_msg
-            print(f"Scraping error: {error_type} - {error_details}")
-            traceback.print_exc()
-            return JSONResponse({"error": error_msg}, status_code=500)
+            except Exception as e:
+                error_type = type(e).__name__
+                error_details = str(e) if str(e) else "No error message available"
+                error_msg = f"Scraping error ({error_type}): {error_details}"
+                progress_store.update(task_id, status="error", message=error_msg)
+                print(f"Scraping error: {error_type} - {error_details}")
+                traceback.print_exc()
+                return JSONResponse({"error": error_msg}, status_code=500)
+            except asyncio.CancelledError:
+                progress_store.update(task_id, status="cancelled", message="Scrape cancelled")
+                raise
 
-        # ✅ Flatten data (results is already a list of dicts from sync function)
+        # ✅ Flatten data (results is already a list of dicts)
         flat_data = results
 
         if not flat_data:
             error_msg = "No data found after scraping"
-            if task_id and task_id in progress_store:
-                progress_store[task_id]["status"] = "error"
-                progress_store[task_id]["message"] = error_msg
+            progress_store.update(task_id, status="error", message=error_msg)
             return JSONResponse({"error": error_msg}, status_code=404)
 
-        if task_id and task_id in progress_store:
-            progress_store[task_id]["percentage"] = 70
-            progress_store[task_id]["message"] = "Creating CSV files..."
-
-        # Sanitize college name (max 50 chars to leave room for course names)
-        safe_name = sanitize_filename(college, max_length=50)
-        zip_filename = f"{safe_name}_fees.zip"
-        zip_path = os.path.join(os.getcwd(), zip_filename)
+        def mark_done():
+            progress_store.update(task_id, percentage=100, status="completed", message=ready_message(statuses))
+            if request_profile:
+                dump_profile(request_profile, profile_id)
 
-        csv_files = []
-        total_files = len(results)
-        files_created = 0
+        headers = profile_headers(request_profile, profile_id) if request_profile else None
+        if format != "zip":
+            progress_store.update(task_id, percentage=70, message=f"Writing {format.upper()} file...")
+            return dataset_response(
+                college, results, format, on_done=mark_done, profile=request_profile, headers=headers
+            )
 
-        for idx, table_data in enumerate(results):
-            for course_name, rows in table_data.items():
-                if not rows:
-                    continue
+        progress_store.update(task_id, percentage=70, message="Creating ZIP archive...")
 
-                # Sanitize course name (max 60 chars) and ensure total path stays under limit
-                safe_course = sanitize_filename(course_name, max_length=60)
-                # Use shorter format: college_course_idx.csv (max total ~150 chars including path)
-                csv_name = f"{safe_name}_{safe_course}_{idx+1}.csv"
-                
-                # Final safety check - truncate if still too long
-                if len(csv_name) > 100:
-                    # Keep college name, truncate course name more aggressively
-                    remaining = 100 - len(safe_name) - len(str(idx+1)) - 7  # 7 for "_" and ".csv"
-                    safe_course = sanitize_filename(course_name, max_length=max(10, remaining))
-                    csv_name = f"{safe_name}_{safe_course}_{idx+1}.csv"
-                
-                csv_path = os.path.join(os.getcwd(), csv_name)
-
-                headers = rows[0].keys()
-
-                # Use UTF-8-sig encoding to add BOM so Excel recognizes UTF-8 and displays symbols correctly
-                with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(headers)
-                    for row in rows:
-                        writer.writerow(row.values())
-
-                csv_files.append(csv_name)
-                files_created += 1
-                
-                if task_id and task_id in progress_store:
-                    progress = 70 + int((files_created / total_files) * 20) if total_files > 0 else 85
-                    progress_store[task_id]["percentage"] = progress
-                    progress_store[task_id]["message"] = f"Created {files_created} of {total_files} CSV files..."
-
-        if task_id and task_id in progress_store:
-            progress_store[task_id]["percentage"] = 90
-            progress_store[task_id]["message"] = "Creating ZIP archive..."
-
-        # ✅ Create ZIP
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for file in csv_files:
-                zipf.write(file)
-                background_tasks.add_task(delete_file, os.path.join(os.getcwd(), file))
-
-        # ✅ Auto delete ZIP
-        background_tasks.add_task(delete_file, zip_path)
-
-        if task_id and task_id in progress_store:
-            progress_store[task_id]["percentage"] = 100
-            progress_store[task_id]["status"] = "completed"
-            progress_store[task_id]["message"] = "Download ready!"
-            # Clean up progress after 5 minutes
-            background_tasks.add_task(cleanup_progress, task_id)
-
-        return FileResponse(
-            path=zip_path,
-            media_type="application/zip",
-            filename=zip_filename
+        # ✅ Stream the ZIP straight from memory
+        return zip_response(
+            college_csv_files(college, results, statuses=statuses, profile=request_profile),
+            zip_filename_for(college),
+            on_done=mark_done,
+            profile=request_profile,
+            headers=headers,
         )
     except Exception as e:
         # Get error information with fallbacks
@@ -502,9 +1831,7 @@ async def scrape(
         traceback.print_exc()
         print(f"{'='*60}\n")
         
-        if task_id and task_id in progress_store:
-            progress_store[task_id]["status"] = "error"
-            progress_store[task_id]["message"] = error_msg
+        progress_store.update(task_id, status="error", message=error_msg)
         
         # Ensure we always return a valid error message
         if not error_msg or error_msg.strip() == "Unexpected error ():":
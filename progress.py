@@ -0,0 +1,316 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+
+
+class ProgressStore(ABC):
+    """Progress entries of scrapes and jobs, keyed by task id.
+
+    Writes are no-ops for a missing task id, mirroring the `if task_id in
+    progress_store` guards the scrape code has always used. A task can be
+    linked to another task's entry (used when requests share one scrape)
+    and unlinked again, which leaves it with a copy of that entry.
+    """
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def set(self, task_id: str, entry: Dict):
+        ...
+
+    @abstractmethod
+    def update(self, task_id: Optional[str], **fields) -> Optional[Dict]:
+        """Merge fields into an existing entry and return it, or None if there is none"""
+
+    @abstractmethod
+    def increment(self, task_id: Optional[str], field: str, amount: int = 1) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        ...
+
+    @abstractmethod
+    def link(self, task_id: str, target: str):
+        ...
+
+    @abstractmethod
+    def unlink(self, task_id: str):
+        ...
+
+    @abstractmethod
+    def entries(self) -> List[Tuple[str, Dict]]:
+        """Every task id with its own (unlinked) entry"""
+
+    @abstractmethod
+    def version(self, task_id: str) -> int:
+        """Changes whenever the entry the task id resolves to changes"""
+
+    @abstractmethod
+    async def wait_for_change(self, task_id: str, version: int, timeout: float):
+        ...
+
+    def __contains__(self, task_id: str) -> bool:
+        return bool(task_id) and self.get(task_id) is not None
+
+    async def watch(self, task_id: str, keepalive: float = 15,
+                    appear_timeout: float = 30) -> AsyncIterator[Optional[Dict]]:
+        """Yield the entry each time it changes until it finishes.
+
+        Yields None when nothing changed within `keepalive` seconds, so
+        callers can keep their connection alive. A task that does not exist
+        yet is waited for up to `appear_timeout` seconds.
+        """
+        seen_version = None
+        last_sent = None
+        deadline = time.monotonic() + appear_timeout
+        while True:
+            current = self.version(task_id)
+            if current != seen_version:
+                seen_version = current
+                entry = self.get(task_id)
+                if entry is not None and entry != last_sent:
+                    last_sent = entry
+                    yield entry
+                if entry is not None and entry.get("status") in FINISHED_STATUSES:
+                    return
+            entry_missing = self.get(task_id) is None
+            if entry_missing and time.monotonic() > deadline:
+                return
+            changed = await self.wait_for_change(task_id, seen_version, keepalive)
+            if not changed and not entry_missing:
+                yield None
+
+
+class MemoryProgressStore(ProgressStore):
+    """Progress kept in this process; changes wake watchers immediately"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict] = {}
+        self._links: Dict[str, str] = {}
+        self._versions: Dict[str, int] = {}
+        self._clock = 0
+        self._changed: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _resolve(self, task_id: str) -> str:
+        return self._links.get(task_id, task_id)
+
+    def _touch(self, key: str):
+        self._clock += 1
+        self._versions[key] = self._clock
+        if self._changed is not None:
+            changed, self._changed = self._changed, None
+            try:
+                on_loop = asyncio.get_running_loop() is self._loop
+            except RuntimeError:
+                on_loop = False
+            if on_loop:
+                changed.set()
+            else:
+                # Updated from a threadpool thread, e.g. by a streaming response body
+                self._loop.call_soon_threadsafe(changed.set)
+
+    def get(self, task_id):
+        entry = self._entries.get(self._resolve(task_id))
+        return dict(entry) if entry is not None else None
+
+    def set(self, task_id, entry):
+        self._links.pop(task_id, None)
+        self._entries[task_id] = dict(entry)
+        self._touch(task_id)
+
+    def update(self, task_id, **fields):
+        if not task_id:
+            return None
+        key = self._resolve(task_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry.update(fields)
+        self._touch(key)
+        return dict(entry)
+
+    def increment(self, task_id, field, amount=1):
+        entry = self.get(task_id) if task_id else None
+        if entry is None:
+            return None
+        return self.update(task_id, **{field: entry.get(field, 0) + amount})
+
+    def delete(self, task_id):
+        self._entries.pop(task_id, None)
+        self._links.pop(task_id, None)
+        self._touch(task_id)
+
+    def link(self, task_id, target):
+        self._entries.pop(task_id, None)
+        self._links[task_id] = target
+
+    def unlink(self, task_id):
+        target = self._links.pop(task_id, None)
+        if target is not None and target in self._entries:
+            self._entries[task_id] = dict(self._entries[target])
+            self._touch(task_id)
+
+    def entries(self):
+        return [(task_id, dict(entry)) for task_id, entry in self._entries.items()]
+
+    def version(self, task_id):
+        key = self._resolve(task_id)
+        return self._versions.get(key, 0) if key in self._entries else -self._versions.get(key, 0)
+
+    async def wait_for_change(self, task_id, version, timeout):
+        while self.version(task_id) == version:
+            if self._changed is None:
+                self._loop = asyncio.get_running_loop()
+                self._changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+
+class SQLiteProgressStore(ProgressStore):
+    """Progress in a SQLite file, shared by every worker process on the host.
+
+    Watchers poll the row version every `poll_interval` seconds, which is a
+    local query rather than an HTTP request per client.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.25):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS progress (
+                task_id TEXT PRIMARY KEY,
+                data TEXT,
+                link TEXT,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _next_version(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM progress").fetchone()[0]
+
+    def _row(self, task_id: str):
+        return self._conn.execute(
+            "SELECT data, link, version FROM progress WHERE task_id = ?", (task_id,)
+        ).fetchone()
+
+    def _resolve(self, task_id: str):
+        """(key, data, version) of the row a task id points at"""
+        row = self._row(task_id)
+        if row is None:
+            return task_id, None, 0
+        data, link, version = row
+        if link:
+            target = self._row(link)
+            if target is None:
+                return link, None, 0
+            return link, target[0], target[2]
+        return task_id, data, version
+
+    def _write(self, task_id: str, data: Optional[Dict], link: Optional[str] = None):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO progress (task_id, data, link, version, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (task_id, json.dumps(data) if data is not None else None, link, self._next_version(), time.time()),
+        )
+
+    def get(self, task_id):
+        with self._lock:
+            _, data, _ = self._resolve(task_id)
+        return json.loads(data) if data else None
+
+    def set(self, task_id, entry):
+        with self._lock:
+            self._write(task_id, entry)
+
+    def update(self, task_id, **fields):
+        if not task_id:
+            return None
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                key, data, _ = self._resolve(task_id)
+                if not data:
+                    return None
+                entry = json.loads(data)
+                entry.update(fields)
+                self._write(key, entry)
+                return entry
+            finally:
+                self._conn.execute("COMMIT")
+
+    def increment(self, task_id, field, amount=1):
+        if not task_id:
+            return None
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                key, data, _ = self._resolve(task_id)
+                if not data:
+                    return None
+                entry = json.loads(data)
+                entry[field] = entry.get(field, 0) + amount
+                self._write(key, entry)
+                return entry
+            finally:
+                self._conn.execute("COMMIT")
+
+    def delete(self, task_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM progress WHERE task_id = ?", (task_id,))
+
+    def link(self, task_id, target):
+        with self._lock:
+            self._write(task_id, None, link=target)
+
+    def unlink(self, task_id):
+        with self._lock:
+            row = self._row(task_id)
+            if row is None or not row[1]:
+                return
+            _, data, _ = self._resolve(task_id)
+            if data:
+                self._write(task_id, json.loads(data))
+            else:
+                self._conn.execute("DELETE FROM progress WHERE task_id = ?", (task_id,))
+
+    def entries(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, data FROM progress WHERE link IS NULL AND data IS NOT NULL"
+            ).fetchall()
+        return [(task_id, json.loads(data)) for task_id, data in rows]
+
+    def version(self, task_id):
+        with self._lock:
+            _, data, version = self._resolve(task_id)
+        return version if data else -version
+
+    async def wait_for_change(self, task_id, version, timeout):
+        deadline = time.monotonic() + timeout
+        while self.version(task_id) == version:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(self.poll_interval)
+        return True
+
+
+def create_progress_store(backend: str = "memory", path: str = "progress.sqlite3") -> ProgressStore:
+    if backend == "sqlite":
+        return SQLiteProgressStore(path)
+    return MemoryProgressStore()
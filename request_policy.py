@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+# Resource types the scraper never needs to read fee tables
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+
+# Analytics, ad and tag-manager hosts seen on collegedunia pages
+DEFAULT_TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "amazon-adsystem.com",
+    "taboola.com",
+    "criteo.com",
+    "moengage.com",
+    "webengage.com",
+)
+
+
+def _host_matches(host: str, suffixes: Iterable[str]) -> bool:
+    return any(host == s or host.endswith("." + s) for s in suffixes)
+
+
+class RequestPolicy:
+    """Decides which requests a scraping context lets through.
+
+    Blocks the resource types in `blocked_types` and every request to a
+    tracker host. When `script_hosts` is given, scripts are only loaded from
+    those hosts (and their subdomains); otherwise any non-tracker script runs.
+    """
+
+    def __init__(
+        self,
+        blocked_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+        tracker_hosts: Iterable[str] = DEFAULT_TRACKER_HOSTS,
+        script_hosts: Optional[Iterable[str]] = None,
+    ):
+        self.blocked_types = frozenset(t.strip().lower() for t in blocked_types if t.strip())
+        self.tracker_hosts = tuple(h.strip().lower() for h in tracker_hosts if h.strip())
+        self.script_hosts = (
+            tuple(h.strip().lower() for h in script_hosts if h.strip())
+            if script_hosts is not None else None
+        )
+
+        # Requests let through, and blocked ones by reason
+        self.allowed = 0
+        self.blocked: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.blocked_types or self.tracker_hosts or self.script_hosts is not None)
+
+    def should_block(self, resource_type: str, url: str) -> Optional[str]:
+        """Why a request should be blocked ("image", "tracker", "script", ...), or None"""
+        if resource_type in self.blocked_types:
+            return resource_type
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            # data: and blob: URLs never leave the browser
+            return None
+        if _host_matches(host, self.tracker_hosts):
+            return "tracker"
+        if resource_type == "script" and self.script_hosts is not None \
+                and not _host_matches(host, self.script_hosts):
+            return "script"
+        return None
+
+    async def install(self, context):
+        """Route every request of a browser context through this policy"""
+        if self.enabled:
+            await context.route("**/*", self._handle)
+
+    async def _handle(self, route):
+        request = route.request
+        reason = self.should_block(request.resource_type, request.url)
+        if reason:
+            self.blocked[reason] = self.blocked.get(reason, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+
+
+def policy_from_settings(blocked_types: str, block_trackers: bool, script_hosts: str) -> RequestPolicy:
+    """Build a policy from comma-separated settings; an empty `script_hosts` allows every script"""
+    return RequestPolicy(
+        blocked_types=blocked_types.split(","),
+        tracker_hosts=DEFAULT_TRACKER_HOSTS if block_trackers else (),
+        script_hosts=script_hosts.split(",") if script_hosts.strip() else None,
+    )
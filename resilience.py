@@ -0,0 +1,158 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+
+class RetryPolicy:
+    """Retries failed page work with exponential backoff and full jitter.
+
+    Attempt n (1-based) that fails waits a random time between 0 and
+    min(max_delay, base_delay * 2 ** (n - 1)) before the next one, so
+    workers that failed together do not retry together.
+    """
+
+    def __init__(self, attempts: int = 3, base_delay: float = 1.0, max_delay: float = 15.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # Retries made, and work that failed every attempt
+        self.retries = 0
+        self.exhausted = 0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def run(self, factory: Callable[[], Awaitable], breaker: "CircuitBreaker" = None,
+                  give_up: Tuple[Type[BaseException], ...] = ()):
+        """Await factory() until it succeeds, raising the last error once every attempt has failed.
+
+        Errors in `give_up` are not worth retrying and are raised at once.
+        Each attempt goes through `breaker` when one is given.
+        """
+        for attempt in range(1, self.attempts + 1):
+            try:
+                if breaker:
+                    return await breaker.call(factory, give_up)
+                return await factory()
+            except give_up:
+                raise
+            except Exception as e:
+                if attempt == self.attempts:
+                    self.exhausted += 1
+                    raise
+                delay = self.backoff(attempt)
+                self.retries += 1
+                print(f"Attempt {attempt} failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Pauses new work while too many recent calls have failed.
+
+    The breaker opens when at least `min_calls` of the last `window` calls
+    were made and `failure_ratio` of them failed. While it is open, callers
+    wait for `cooldown` seconds instead of failing. Then a single probe call
+    is let through. If the probe succeeds the breaker closes; if it fails the
+    breaker opens again.
+    """
+
+    def __init__(self, failure_ratio: float = 0.5, window: int = 20, min_calls: int = 8,
+                 cooldown: float = 30.0):
+        self.failure_ratio = failure_ratio
+        self.min_calls = max(1, min_calls)
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=max(window, self.min_calls))
+        self._open_until: Optional[float] = None
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._open_until is None:
+            return "closed"
+        return "open" if time.monotonic() < self._open_until else "half_open"
+
+    async def _admit(self) -> bool:
+        """Wait until a call may start; True if it is the half-open probe"""
+        while True:
+            if self._open_until is None:
+                return False
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            elif not self._probing:
+                self._probing = True
+                return True
+            else:
+                # Another call is probing; check again shortly
+                await asyncio.sleep(min(1.0, self.cooldown))
+
+    def _record(self, ok: bool, probe: bool):
+        if probe:
+            self._probing = False
+            if ok:
+                self._open_until = None
+                self._outcomes.clear()
+                print("Circuit breaker closed")
+            else:
+                self._trip()
+            return
+        if self._open_until is not None:
+            # Finished after the breaker opened; the probe decides what happens next
+            return
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_ratio:
+            self._trip()
+
+    def _trip(self):
+        self._open_until = time.monotonic() + self.cooldown
+        self._outcomes.clear()
+        self.trips += 1
+        print(f"Circuit breaker open, pausing new work for {self.cooldown:g}s")
+
+    async def call(self, factory: Callable[[], Awaitable], give_up: Tuple[Type[BaseException], ...] = ()):
+        """Await factory() once the breaker admits it.
+
+        Errors in `give_up` describe the page rather than the host (a college
+        without courses), so they count as successful calls.
+        """
+        probe = await self._admit()
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            if probe:
+                self._probing = False
+            raise
+        except give_up:
+            self._record(True, probe)
+            raise
+        except Exception:
+            self._record(False, probe)
+            raise
+        self._record(True, probe)
+        return result
+
+
+class HostCircuitBreakers:
+    """One circuit breaker per host name"""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(**self.options)
+        return self._breakers[host]
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            host: {"state": breaker.state, "trips": breaker.trips}
+            for host, breaker in self._breakers.items()
+        }
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+def content_hash(value) -> str:
+    """Short stable hash of JSON-serializable data or text"""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultCache:
+    """SQLite cache of scraped fee tables, keyed by college slug and course.
+
+    A college's results are served while they are younger than `ttl`
+    seconds. When the stored data grows past `max_bytes`, the least recently
+    used colleges are evicted first. A ttl of 0 disables the cache.
+
+    Each course also keeps a hash per table and the hash of its entry on the
+    course listing, so an incremental refresh can tell which courses changed.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._initialized = False
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS colleges (
+                    slug TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS courses (
+                    slug TEXT NOT NULL,
+                    course TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (slug, course)
+                );
+            """)
+            # Change-detection columns, added to caches created before them
+            self._add_column(conn, "colleges", "listing_hash", "TEXT")
+            self._add_column(conn, "courses", "listing_hash", "TEXT")
+            self._add_column(conn, "courses", "table_hashes", "TEXT")
+            # The scrape's course statuses, so cache hits report the same courses
+            self._add_column(conn, "colleges", "statuses", "TEXT")
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _add_column(conn: sqlite3.Connection, table: str, column: str, kind: str):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    def get(self, slug: str) -> Optional[List[Dict]]:
+        """Return cached results for a college, or None on a miss"""
+        found = self.lookup(slug)
+        return found[0] if found else None
+
+    def lookup(self, slug: str) -> Optional[Tuple[List[Dict], Optional[List[Dict]]]]:
+        """(results, course statuses) cached for a college, or None on a miss.
+
+        The statuses are None for results stored without them.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT fetched_at, statuses FROM colleges WHERE slug = ?", (slug,)
+                ).fetchone()
+                now = time.time()
+                if row is None or now - row[0] > self.ttl:
+                    self.misses += 1
+                    return None
+
+                results = []
+                for (data,) in conn.execute(
+                    "SELECT data FROM courses WHERE slug = ? ORDER BY position", (slug,)
+                ):
+                    results.extend(json.loads(data))
+                conn.execute("UPDATE colleges SET accessed_at = ? WHERE slug = ?", (now, slug))
+                conn.commit()
+                self.hits += 1
+                return results, json.loads(row[1]) if row[1] else None
+            finally:
+                conn.close()
+
+    def snapshot(self, slug: str) -> Optional[Dict]:
+        """Everything stored for a college regardless of age, for change detection.
+
+        Returns {"listing_hash": ..., "courses": {course: {"position",
+        "entries", "listing_hash", "table_hashes"}}}, or None if nothing is stored.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT listing_hash FROM colleges WHERE slug = ?", (slug,)
+                ).fetchone()
+                if row is None:
+                    return None
+                courses = {}
+                for course, position, data, listing_hash, table_hashes in conn.execute(
+                    "SELECT course, position, data, listing_hash, table_hashes FROM courses "
+                    "WHERE slug = ? ORDER BY position", (slug,)
+                ):
+                    entries = json.loads(data)
+                    courses[course] = {
+                        "position": position,
+                        "entries": entries,
+                        "listing_hash": listing_hash,
+                        "table_hashes": json.loads(table_hashes) if table_hashes else
+                        [content_hash(rows) for entry in entries for rows in entry.values()],
+                    }
+                return {"listing_hash": row[0], "courses": courses}
+            finally:
+                conn.close()
+
+    def touch(self, slug: str):
+        """Mark a college's stored results as fresh without rewriting them"""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            try:
+                now = time.time()
+                conn.execute(
+                    "UPDATE colleges SET fetched_at = ?, accessed_at = ? WHERE slug = ?", (now, now, slug)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def put(self, slug: str, results: List[Dict], listing_hashes: Optional[Dict[str, str]] = None,
+            listing_hash: Optional[str] = None, statuses: Optional[List[Dict]] = None,
+            courses: Optional[List[Tuple[str, List[Dict]]]] = None):
+        """Store a college's results, replacing anything cached for it.
+
+        Table entries are grouped by course name, unless `courses` gives the
+        (key, entries) of every course in listing order; incremental refreshes
+        pass it so courses sharing a name, and courses without tables, are
+        stored apart. `listing_hashes` maps course keys to the hash of their
+        listing entry, and `listing_hash` covers the whole listing.
+        `statuses` are the scrape's course statuses, returned by lookup().
+        """
+        if not self.enabled or not results:
+            return
+        listing_hashes = listing_hashes or {}
+
+        if courses is not None:
+            by_course = dict(courses)
+        else:
+            # Group table entries by course, keeping scrape order
+            by_course: Dict[str, List[Dict]] = {}
+            for entry in results:
+                for course in entry:
+                    by_course.setdefault(course, []).append(entry)
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                now = time.time()
+                size = 0
+                conn.execute("DELETE FROM courses WHERE slug = ?", (slug,))
+                for position, (course, entries) in enumerate(by_course.items()):
+                    data = json.dumps(entries, ensure_ascii=False)
+                    size += len(data)
+                    table_hashes = [content_hash(rows) for entry in entries for rows in entry.values()]
+                    conn.execute(
+                        "INSERT INTO courses (slug, course, position, data, listing_hash, table_hashes) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (slug, course, position, data, listing_hashes.get(course), json.dumps(table_hashes)),
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO colleges (slug, fetched_at, accessed_at, size, listing_hash, statuses) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (slug, now, now, size, listing_hash,
+                     json.dumps(statuses, ensure_ascii=False) if statuses is not None else None),
+                )
+                self.stores += 1
+                self._evict(conn, now)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        cutoff = now - self.ttl
+        victims = [
+            slug for (slug,) in conn.execute(
+                "SELECT slug FROM colleges WHERE fetched_at < ?", (cutoff,)
+            )
+        ]
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM colleges WHERE fetched_at >= ?", (cutoff,)
+        ).fetchone()[0]
+        if total > self.max_bytes:
+            # Least recently used first
+            for slug, size in conn.execute(
+                "SELECT slug, size FROM colleges WHERE fetched_at >= ? ORDER BY accessed_at", (cutoff,)
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                victims.append(slug)
+                total -= size
+
+        for slug in victims:
+            conn.execute("DELETE FROM courses WHERE slug = ?", (slug,))
+            conn.execute("DELETE FROM colleges WHERE slug = ?", (slug,))
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict:
+        entries, size = 0, 0
+        if self.enabled and os.path.exists(self.path):
+            with self._lock:
+                conn = self._connect()
+                try:
+                    entries, size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM colleges"
+                    ).fetchone()
+                finally:
+                    conn.close()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
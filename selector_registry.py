@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# 1-based index of the first selector with a match (0 while there is none).
+# With `unseen`, elements already marked by a harvest (data-scrape-seen) are ignored.
+FIRST_MATCH_JS = """([selectors, unseen]) => {
+    for (let i = 0; i < selectors.length; i++) {
+        let found;
+        try {
+            found = Array.from(document.querySelectorAll(selectors[i]));
+        } catch (e) {
+            continue;
+        }
+        if (unseen) found = found.filter((el) => !el.dataset.scrapeSeen);
+        if (found.length) return i + 1;
+    }
+    return 0;
+}"""
+
+
+def layout_key(url: str) -> str:
+    """Pages on one host share a layout, and so share remembered selectors"""
+    return (urlsplit(url).hostname or "").lower()
+
+
+class SelectorRegistry:
+    """Ranked fallback selectors for each element role on the scraped pages.
+
+    resolve() waits, in the page, until one of a role's selectors matches and
+    remembers the winner for that layout, so later pages try it first. When
+    the site redeploys and its hashed class names change, scrapes carry on
+    with the next selector instead of finding nothing.
+    """
+
+    def __init__(self, candidates: Dict[str, List[str]]):
+        self.candidates = {role: list(selectors) for role, selectors in candidates.items()}
+        self._winners: Dict[tuple, str] = {}
+
+        # Lookups that matched, matched only a fallback, or matched nothing
+        self.resolved = 0
+        self.fallbacks = 0
+        self.misses = 0
+
+    def ranked(self, role: str, layout: str) -> List[str]:
+        """The role's selectors, the one that last worked for `layout` first"""
+        selectors = self.candidates[role]
+        winner = self._winners.get((role, layout))
+        if winner is None:
+            return list(selectors)
+        return [winner] + [s for s in selectors if s != winner]
+
+    def union(self, role: str) -> str:
+        """One selector matching anything any of the role's selectors match"""
+        return ", ".join(self.candidates[role])
+
+    def remember(self, role: str, layout: str, selector: str):
+        if self._winners.get((role, layout)) != selector:
+            print(f"Using selector for {role} on {layout or 'unknown layout'}: {selector}")
+        self._winners[(role, layout)] = selector
+
+    async def resolve(self, page, role: str, layout: str, timeout: float,
+                      unseen: bool = False) -> Optional[str]:
+        """Wait up to `timeout` seconds for the role to appear and return the matching selector.
+
+        Returns None when none of the selectors match in time.
+        """
+        ranked = self.ranked(role, layout)
+        try:
+            handle = await page.wait_for_function(
+                FIRST_MATCH_JS, arg=[ranked, unseen], timeout=timeout * 1000
+            )
+            index = await handle.json_value() - 1
+        except PlaywrightTimeoutError:
+            self.misses += 1
+            return None
+
+        selector = ranked[index]
+        self.resolved += 1
+        if selector != self.candidates[role][0]:
+            self.fallbacks += 1
+        self.remember(role, layout, selector)
+        return selector
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+
+class SQLiteTaskQueue:
+    """Durable queue of scrape tasks in a SQLite file, shared by the API and its workers.
+
+    The API enqueues a batch of tasks (count a college's courses, scrape one
+    course, ...) and polls for their results; worker processes claim tasks,
+    run them and store the result. A claimed task is leased for `lease`
+    seconds and the worker keeps extending it with heartbeat() while it runs.
+    If the worker dies, the lease runs out and another worker picks the task
+    up again, up to `max_attempts` times before it fails. Every process using
+    the same file (on a filesystem they share) sees the same queue.
+    """
+
+    def __init__(self, path: str, lease: float = 60, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                leased_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, id);
+            CREATE INDEX IF NOT EXISTS tasks_by_batch ON tasks (batch);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker TEXT PRIMARY KEY,
+                seen_at REAL NOT NULL
+            );
+        """)
+
+    def enqueue(self, batch: str, kind: str, payloads: List[Dict]) -> List[int]:
+        """Queue one task per payload and return their ids"""
+        now = time.time()
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for payload in payloads:
+                    cursor = self._conn.execute(
+                        "INSERT INTO tasks (batch, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                        (batch, kind, json.dumps(payload, ensure_ascii=False), now),
+                    )
+                    ids.append(cursor.lastrowid)
+            finally:
+                self._conn.execute("COMMIT")
+        return ids
+
+    def claim(self, worker: str, limit: int = 1) -> List[Tuple[int, str, Dict]]:
+        """Lease up to `limit` queued (or abandoned) tasks to a worker, oldest first.
+
+        Returns (task id, kind, payload) for each. Tasks whose lease ran out
+        `max_attempts` times are failed instead of handed out again.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO workers (worker, seen_at) VALUES (?, ?)", (worker, now)
+                )
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'done', result = ? "
+                    "WHERE status = 'leased' AND leased_until < ? AND attempts >= ?",
+                    (json.dumps({"error": "Worker lost the task too many times"}), now, self.max_attempts),
+                )
+                rows = self._conn.execute(
+                    "SELECT id, kind, payload FROM tasks "
+                    "WHERE status = 'queued' OR (status = 'leased' AND leased_until < ?) "
+                    "ORDER BY id LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                for task_id, _, _ in rows:
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'leased', worker = ?, leased_until = ?, attempts = attempts + 1 "
+                        "WHERE id = ?",
+                        (worker, now + self.lease, task_id),
+                    )
+            finally:
+                self._conn.execute("COMMIT")
+        return [(task_id, kind, json.loads(payload)) for task_id, kind, payload in rows]
+
+    def complete(self, task_id: int, worker: str, result: Dict) -> bool:
+        """Store a task's result; False if the task was cancelled or re-leased to another worker"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, leased_until = NULL "
+                "WHERE id = ? AND status = 'leased' AND worker = ?",
+                (json.dumps(result, ensure_ascii=False), task_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, worker: str, task_ids: List[int]):
+        """Mark a worker alive and extend the leases of the tasks it is running"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO workers (worker, seen_at) VALUES (?, ?)", (worker, now)
+                )
+                for task_id in task_ids:
+                    self._conn.execute(
+                        "UPDATE tasks SET leased_until = ? WHERE id = ? AND status = 'leased' AND worker = ?",
+                        (now + self.lease, task_id, worker),
+                    )
+            finally:
+                self._conn.execute("COMMIT")
+
+    def finished(self, task_ids: List[int]) -> List[int]:
+        """Which of the given tasks are done, without reading their results"""
+        return [task_id for (task_id,) in self._select("SELECT id FROM tasks WHERE status = 'done'", task_ids)]
+
+    def results(self, task_ids: List[int]) -> Dict[int, Dict]:
+        """Task id -> result for the given tasks that are done"""
+        rows = self._select("SELECT id, result FROM tasks WHERE status = 'done'", task_ids)
+        return {task_id: json.loads(result) for task_id, result in rows}
+
+    def _select(self, query: str, task_ids: List[int]) -> List[Tuple]:
+        # Chunked to stay under SQLite's limit on bound parameters
+        task_ids = list(task_ids)
+        rows = []
+        with self._lock:
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                rows += self._conn.execute(
+                    f"{query} AND id IN ({', '.join('?' * len(chunk))}) ORDER BY id", chunk
+                ).fetchall()
+        return rows
+
+    def discard(self, batch: str):
+        """Forget a batch; workers still running its tasks have their results dropped"""
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE batch = ?", (batch,))
+
+    def workers_seen(self, within: float) -> int:
+        """Workers that asked for work or sent a heartbeat in the last `within` seconds"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE seen_at >= ?", (time.time() - within,)
+            ).fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {"queued": 0, "leased": 0, "done": 0}
+        counts.update(dict(rows))
+        return counts
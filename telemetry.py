@@ -0,0 +1,155 @@
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds, from a quick DOM read to a whole college
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_DONE = object()
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator[Tuple[str, int]]:
+        """(le, observations <= le) for every bucket, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield ("+Inf" if bound == float("inf") else f"{bound:g}"), total
+
+
+class Profile:
+    """Every span recorded while it is active, for one request's profile dump"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds spent per phase, summed over its spans"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span["phase"]] = totals.get(span["phase"], 0.0) + span["seconds"]
+        return totals
+
+    def as_dict(self) -> Dict:
+        return {"totals": self.totals(), "spans": self.spans}
+
+
+class Telemetry:
+    """Timing spans for the phases of the scrape pipeline.
+
+    span(phase, **labels) times a block into the phase's histogram; labels
+    such as college or course are inherited by spans nested inside it. After
+    start_profile(), spans started in that task (and in tasks created from it)
+    are also recorded one by one, with their labels and start offset.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.courses: Dict[str, int] = {}
+        self._labels: ContextVar[Dict] = ContextVar("telemetry_labels", default={})
+        self._profile: ContextVar[Optional[Profile]] = ContextVar("telemetry_profile", default=None)
+
+    def observe(self, phase: str, seconds: float, error: bool = False, started: float = None,
+                profile: Profile = None, **labels):
+        """Record one span; it goes to `profile`, or else to the context's active profile"""
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        if error:
+            self.errors[phase] = self.errors.get(phase, 0) + 1
+
+        profile = profile or self._profile.get()
+        if profile is not None:
+            started = time.perf_counter() - seconds if started is None else started
+            record = {"phase": phase, **self._labels.get(), **labels,
+                      "start": round(started - profile.started, 6), "seconds": round(seconds, 6)}
+            if error:
+                record["error"] = True
+            profile.spans.append(record)
+
+    @contextmanager
+    def span(self, phase: str, **labels):
+        token = self._labels.set({**self._labels.get(), **labels}) if labels else None
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            if token is not None:
+                self._labels.reset(token)
+            self.observe(phase, time.perf_counter() - started, error, started, **labels)
+
+    def timed(self, chunks: Iterable, phase: str, profile: Profile = None, **labels) -> Iterator:
+        """Pass `chunks` through, recording the time spent producing them as one span.
+
+        Response bodies are iterated outside the request's context, so a
+        profile has to be passed in rather than picked up from it.
+        """
+        seconds, first = 0.0, None
+        iterator = iter(chunks)
+        while True:
+            started = time.perf_counter()
+            if first is None:
+                first = started
+            chunk = next(iterator, _DONE)
+            seconds += time.perf_counter() - started
+            if chunk is _DONE:
+                break
+            yield chunk
+        self.observe(phase, seconds, started=first, profile=profile, **labels)
+
+    def start_profile(self) -> Profile:
+        """Record every span started from here on in the current task (and tasks it creates)"""
+        profile = Profile()
+        self._profile.set(profile)
+        return profile
+
+    def count_course(self, status: str):
+        self.courses[status] = self.courses.get(status, 0) + 1
+
+    def prometheus(self, prefix: str = "scrape") -> List[str]:
+        """Histograms and counters in Prometheus text format"""
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent in each phase of the scrape pipeline",
+            f"# TYPE {prefix}_phase_seconds histogram",
+        ]
+        for phase, histogram in sorted(self.histograms.items()):
+            for le, count in histogram.cumulative():
+                lines.append(f'{prefix}_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {count}')
+            lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+        lines += [
+            f"# HELP {prefix}_phase_errors_total Phase spans that ended with an exception",
+            f"# TYPE {prefix}_phase_errors_total counter",
+        ]
+        for phase, count in sorted(self.errors.items()):
+            lines.append(f'{prefix}_phase_errors_total{{phase="{phase}"}} {count}')
+        lines += [
+            f"# HELP {prefix}_courses_total Courses scraped, by outcome",
+            f"# TYPE {prefix}_courses_total counter",
+        ]
+        for status, count in sorted(self.courses.items()):
+            lines.append(f'{prefix}_courses_total{{status="{status}"}} {count}')
+        return lines
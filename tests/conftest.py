@@ -0,0 +1,41 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from result_cache import ResultCache, content_hash  # noqa: E402
+
+
+class FakePool:
+    max_pages = 5
+
+    @asynccontextmanager
+    async def page(self):
+        yield None
+
+
+@pytest.fixture
+def college(monkeypatch, tmp_path):
+    """Three listed courses; the second one renders no fee tables. Yields the indices scraped."""
+    scraped = []
+
+    async def listing(url, pool=None):
+        return [(f"Course {i}", content_hash(f"listing {i}")) for i in range(3)]
+
+    async def scrape_table(page, url, index):
+        scraped.append(index)
+        return [] if index == 1 else [{f"Course {index}": [{"Year": "1", "Fee": str(index)}]}]
+
+    async def total_courses(url, pool=None):
+        return 3
+
+    monkeypatch.setattr(main, "result_cache", ResultCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(main, "read_course_listing", listing)
+    monkeypatch.setattr(main, "scrape_table", scrape_table)
+    monkeypatch.setattr(main, "get_total_courses", total_courses)
+    return scraped
@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from catalog import CollegeCatalog, aliases_for
+
+LINKS = {
+    "IIT Bombay - Indian Institute of Technology - [IITB], Mumbai": "/university/25703-iit-bombay",
+    "IIT Delhi - Indian Institute of Technology [IITD], New Delhi": "/university/25455-iit-delhi",
+    "R V College of Engineering - [RVCE], Bangalore": "/college/12345-rv-college-of-engineering",
+    "Vellore Institute of Technology - [VIT], Vellore": "/university/12000-vit-vellore",
+}
+
+
+def write(path, links):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(links, f)
+    # Make every rewrite visible to the mtime check, however quick
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = str(tmp_path / "college_links.json")
+    write(path, LINKS)
+    return path
+
+
+def names(catalog, query):
+    return [item["name"] for item in catalog.search(query)[1]]
+
+
+def test_aliases():
+    assert aliases_for("IIT Bombay - Indian Institute of Technology - [IITB], Mumbai") == {"iitb", "ib"}
+    assert aliases_for("Indian Institute of Science") == {"iis"}
+
+
+def test_resolve(catalog_path):
+    catalog = CollegeCatalog(catalog_path)
+    iitb = "IIT Bombay - Indian Institute of Technology - [IITB], Mumbai"
+    assert catalog.resolve(iitb) == iitb
+    assert catalog.resolve(iitb.upper()) == iitb
+    assert catalog.resolve("25703-iit-bombay") == iitb
+    assert catalog.resolve("IITB") == iitb
+    assert catalog.resolve("Indian") is None
+
+
+def test_search_ranks_alias_then_prefix(catalog_path):
+    catalog = CollegeCatalog(catalog_path)
+    assert names(catalog, "rvce") == ["R V College of Engineering - [RVCE], Bangalore"]
+    assert names(catalog, "iit d") == ["IIT Delhi - Indian Institute of Technology [IITD], New Delhi"]
+    # Both IITs start with "iit"; VIT only has "Institute of Technology" in it
+    assert names(catalog, "iit")[:2] == [
+        "IIT Bombay - Indian Institute of Technology - [IITB], Mumbai",
+        "IIT Delhi - Indian Institute of Technology [IITD], New Delhi",
+    ]
+    assert catalog.search("")[0] == len(LINKS)
+
+
+def test_search_falls_back_to_trigrams(catalog_path):
+    catalog = CollegeCatalog(catalog_path)
+    assert names(catalog, "velore institue")[0] == "Vellore Institute of Technology - [VIT], Vellore"
+    assert names(catalog, "zzzz") == []
+
+
+def test_reload_and_bad_file(catalog_path):
+    catalog = CollegeCatalog(catalog_path, check_interval=0)
+    version = catalog.version
+    write(catalog_path, {"New College": "/college/1-new-college"})
+    assert catalog.resolve("New College") == "New College"
+    assert catalog.version != version and catalog.loads == 2
+
+    with open(catalog_path, "w") as f:
+        f.write("{not json")
+    os.utime(catalog_path, ns=(0, os.stat(catalog_path).st_mtime_ns + 2_000_000_000))
+    catalog.refresh()
+    assert list(catalog) == ["New College"]
+
+
+def test_etag_changes_when_the_file_changes(catalog_path, monkeypatch):
+    monkeypatch.setattr(main, "college_catalog", CollegeCatalog(catalog_path, check_interval=0))
+    client = TestClient(main.app)
+    first = client.get("/colleges")
+    etag = first.headers["etag"]
+    assert client.get("/colleges", headers={"If-None-Match": etag}).status_code == 304
+
+    write(catalog_path, {"New College": "/college/1-new-college"})
+    changed = client.get("/colleges", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["total"] == 1
@@ -0,0 +1,40 @@
+import pytest
+
+from extract import parse_amount
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("₹ 2,17,000", 217000.0),
+    ("₹2,17,000 (1st Yr Fees)", 217000.0),
+    ("Rs. 1.5 Lakhs (1st Yr Fees)", 150000.0),
+    ("INR 85000", 85000.0),
+    ("85000/-", 85000.0),
+    ("2,17,000", 217000.0),
+    ("217,000 - 3,00,000", 217000.0),
+    ("1.2 Cr", 12000000.0),
+    ("85k", 85000.0),
+    ("₹ 2,17,000 per year", 217000.0),
+    ("₹ 1.5 Lakhs per annum", 150000.0),
+    ("₹ 85,000 Total", 85000.0),
+    ("₹ 1,00,000 + GST", 100000.0),
+    ("1.5L/yr", 150000.0),
+])
+def test_amounts(text, amount):
+    assert parse_amount(text) == amount
+
+
+@pytest.mark.parametrize("text", [
+    "2021-22",
+    "1-2 years",
+    "1",
+    "2 Years",
+    "3 Labs",
+    "2021 onwards",
+    "85000",
+    "1,2",
+    "Hostel",
+    "",
+    None,
+])
+def test_not_amounts(text):
+    assert parse_amount(text) is None
@@ -0,0 +1,70 @@
+import asyncio
+
+import main
+from conftest import FakePool
+from result_cache import content_hash
+
+
+def refresh():
+    statuses = []
+    results = asyncio.run(main.incremental_scrape(
+        "college", "https://example.com/college/courses-fees", on_status=statuses.append,
+        mode="per_course", pool=FakePool(),
+    ))
+    return results, statuses
+
+
+def test_unchanged_refresh_with_an_empty_course_scrapes_nothing(college):
+    first, _ = refresh()
+    assert sorted(college) == [0, 1, 2]
+
+    college.clear()
+    second, statuses = refresh()
+    assert college == []
+    assert second == first
+    assert [(s["course"], s["status"], s["change"]) for s in statuses] == [
+        ("Course 0", "ok", "unchanged"),
+        ("Course 1", "empty", "unchanged"),
+        ("Course 2", "ok", "unchanged"),
+    ]
+
+
+def test_course_missing_from_an_older_cache_is_scraped_again(college):
+    refresh()
+    # Caches written before empty courses were stored only had courses with tables
+    snapshot = main.result_cache.snapshot("college")
+    main.result_cache.put(
+        "college", main.result_cache.get("college"),
+        {name: course["listing_hash"] for name, course in snapshot["courses"].items() if course["entries"]},
+        snapshot["listing_hash"],
+    )
+    assert "Course 1" not in main.result_cache.snapshot("college")["courses"]
+
+    college.clear()
+    _, statuses = refresh()
+    assert college == [1]
+    assert [s["change"] for s in statuses] == ["unchanged", "added", "unchanged"]
+
+
+def test_courses_sharing_a_name_keep_their_own_tables(college, monkeypatch):
+    names = ["B.Tech", "B.Tech", "MBA"]
+
+    async def listing(url, pool=None):
+        return [(name, content_hash(f"listing {i}")) for i, name in enumerate(names)]
+
+    async def scrape_table(page, url, index):
+        college.append(index)
+        return [{names[index]: [{"Year": "1", "Fee": str(index)}]}]
+
+    monkeypatch.setattr(main, "read_course_listing", listing)
+    monkeypatch.setattr(main, "scrape_table", scrape_table)
+
+    first, _ = refresh()
+    assert len(first) == 3
+
+    college.clear()
+    second, statuses = refresh()
+    assert college == []
+    assert sorted(second, key=str) == sorted(first, key=str)
+    assert [(s["index"], s["change"]) for s in statuses] == [(0, "unchanged"), (1, "unchanged"), (2, "unchanged")]
+    assert len(main.result_cache.get("college")) == 3
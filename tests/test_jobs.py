@@ -0,0 +1,65 @@
+import asyncio
+
+from jobs import Job, JobQueue
+
+
+async def run_queue(submissions):
+    """Queue jobs behind a running one, return their positions and the order they then ran in"""
+    ran = []
+    release = asyncio.Event()
+
+    async def runner(job):
+        if job.college == "blocker":
+            await release.wait()
+        else:
+            ran.append(job.college)
+
+    queue = JobQueue(runner, workers=1)
+    await queue.start()
+    try:
+        blocker = await queue.submit(Job("blocker", "someone"))
+        while blocker.status != "running":
+            await asyncio.sleep(0)
+        jobs = [await queue.submit(Job(college, user, priority)) for college, user, priority in submissions]
+        assert queue.queued == len(jobs) and queue.running == 1
+        positions = {job.college: queue.position(job) for job in jobs}
+        release.set()
+        while queue.queued or queue.running:
+            await asyncio.sleep(0)
+    finally:
+        await queue.stop()
+    return sorted(positions, key=positions.get), ran
+
+
+def test_users_take_turns():
+    expected = ["a1", "b1", "a2", "b2", "a3"]
+    by_position, ran = asyncio.run(run_queue([
+        ("a1", "alice", 0), ("a2", "alice", 0), ("a3", "alice", 0),
+        ("b1", "bob", 0), ("b2", "bob", 0),
+    ]))
+    assert ran == expected
+    assert by_position == expected
+
+
+def test_higher_priority_runs_first():
+    expected = ["c1", "a2", "b1", "a1"]
+    by_position, ran = asyncio.run(run_queue([
+        ("a1", "alice", 0), ("b1", "bob", 0), ("c1", "carol", 5), ("a2", "alice", 5),
+    ]))
+    assert ran == expected
+    assert by_position == expected
+
+
+def test_no_position_once_running():
+    async def scenario():
+        queue = JobQueue(lambda job: asyncio.sleep(0), workers=1)
+        await queue.start()
+        try:
+            job = await queue.submit(Job("college", "alice"))
+            while not job.finished:
+                await asyncio.sleep(0)
+            return queue.position(job)
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, RetryPolicy
+
+
+class NoCourses(Exception):
+    pass
+
+
+async def no_courses():
+    raise NoCourses()
+
+
+async def host_error():
+    raise RuntimeError("connection reset")
+
+
+def fail_times(call, times: int):
+    async def run():
+        for _ in range(times):
+            with pytest.raises(Exception):
+                await call()
+    asyncio.run(run())
+
+
+def test_give_up_errors_do_not_trip_the_breaker():
+    breaker = CircuitBreaker(min_calls=8, cooldown=30)
+    policy = RetryPolicy(attempts=3, base_delay=0)
+    fail_times(lambda: policy.run(no_courses, breaker, give_up=(NoCourses,)), 4)
+    fail_times(lambda: breaker.call(no_courses, give_up=(NoCourses,)), 4)
+    assert breaker.state == "closed"
+    assert policy.retries == 0
+
+
+def test_host_errors_trip_the_breaker():
+    breaker = CircuitBreaker(min_calls=8, cooldown=30)
+    fail_times(lambda: breaker.call(host_error), 8)
+    assert breaker.state == "open"
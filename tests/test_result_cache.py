@@ -0,0 +1,28 @@
+import asyncio
+
+import main
+from conftest import FakePool
+from result_cache import ResultCache
+
+URL = "https://example.com/college/courses-fees"
+
+
+def test_cache_hit_reports_the_statuses_of_the_scrape(college):
+    _, scraped = asyncio.run(main.coalesced_scrape("college", URL, mode="per_course", pool=FakePool()))
+    assert [(s["index"], s["status"]) for s in scraped] == [(0, "ok"), (1, "empty"), (2, "ok")]
+
+    _, cached = asyncio.run(main.cached_scrape("college"))
+    assert cached == scraped
+
+
+def test_statuses_are_rebuilt_for_entries_stored_without_them(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("college", [{"A": [{"Fee": "1"}]}, {"B": [{"Fee": "2"}]}])
+    results, statuses = cache.lookup("college")
+    assert statuses is None
+    assert cache.get("college") == results
+    assert [s["course"] for s in main.cached_course_statuses(results)] == ["A", "B"]
+
+
+def test_miss(tmp_path):
+    assert ResultCache(str(tmp_path / "cache.sqlite3")).lookup("college") is None
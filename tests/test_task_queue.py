@@ -0,0 +1,67 @@
+import pytest
+
+import task_queue
+from task_queue import SQLiteTaskQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(task_queue.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return SQLiteTaskQueue(str(tmp_path / "tasks.sqlite3"), lease=60, max_attempts=2)
+
+
+def test_expired_lease_is_claimed_again(queue, clock):
+    [task_id] = queue.enqueue("batch", "course", [{"index": 0}])
+    assert queue.claim("a") == [(task_id, "course", {"index": 0})]
+    assert queue.claim("b") == []
+
+    clock[0] += 61
+    assert queue.claim("b") == [(task_id, "course", {"index": 0})]
+    # The first worker lost the task, its late result is dropped
+    assert not queue.complete(task_id, "a", {"total": 1})
+    assert queue.complete(task_id, "b", {"total": 2})
+    assert queue.results([task_id]) == {task_id: {"total": 2}}
+
+
+def test_heartbeat_keeps_the_lease(queue, clock):
+    [task_id] = queue.enqueue("batch", "course", [{}])
+    queue.claim("a")
+    clock[0] += 50
+    queue.heartbeat("a", [task_id])
+    clock[0] += 50
+    assert queue.claim("b") == []
+
+
+def test_task_lost_too_often_fails(queue, clock):
+    [task_id] = queue.enqueue("batch", "course", [{}])
+    queue.claim("a")
+    clock[0] += 61
+    queue.claim("b")
+    clock[0] += 61
+    assert queue.claim("c") == []
+    assert queue.finished([task_id]) == [task_id]
+    assert "error" in queue.results([task_id])[task_id]
+
+
+def test_finished_and_results_only_cover_the_given_done_tasks(queue):
+    first, second, third = queue.enqueue("batch", "course", [{}, {}, {}])
+    for task_id, _, _ in queue.claim("a", 3):
+        if task_id != second:
+            queue.complete(task_id, "a", {"id": task_id})
+    assert queue.finished([second, third]) == [third]
+    assert queue.results([first, second]) == {first: {"id": first}}
+
+
+def test_discard_withdraws_the_batch(queue):
+    [task_id] = queue.enqueue("batch", "course", [{}])
+    queue.enqueue("other", "course", [{}])
+    queue.claim("a")
+    queue.discard("batch")
+    assert not queue.complete(task_id, "a", {})
+    assert queue.stats() == {"queued": 1, "leased": 0, "done": 0}
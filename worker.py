@@ -0,0 +1,102 @@
+"""Scrape worker: runs the page work of an app started with SCRAPE_BACKEND=queue.
+
+Claims tasks from the shared task queue (TASK_QUEUE_PATH), runs them with its
+own browser pool and stores the results for the app to gather. Start as many
+workers as the machines can hold, on any host that sees the queue file; a
+worker that dies has its tasks handed to another once its lease runs out.
+Reads the same environment settings as the app (browser pool, rate limits,
+retries, selectors).
+
+Run from the repository root:  python worker.py --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import socket
+
+import main
+from task_queue import SQLiteTaskQueue
+
+
+async def execute(kind: str, payload: dict) -> dict:
+    """Run one task and return its JSON-serializable result"""
+    url = payload["url"]
+    if kind == "count":
+        return {"total": await main.get_total_courses(url)}
+    if kind == "listing":
+        return {"listing": await main.read_course_listing(url)}
+    if kind == "course":
+        tables, status = await main.scrape_single_course(payload["index"], url)
+        return {"tables": tables, "status": status}
+    if kind == "college":
+        courses, statuses = [], []
+        await main.host_breakers.breaker(url).call(
+            lambda: main.scrape_all_courses(
+                url, expand=payload.get("expand", "sequential"),
+                on_course=lambda index, tables: courses.append([index, tables]),
+                on_status=statuses.append, indices=payload.get("indices"),
+            ),
+            give_up=(main.NoCoursesFound,),
+        )
+        return {"courses": courses, "statuses": statuses}
+    raise ValueError(f"Unknown task kind: {kind}")
+
+
+async def run_worker(queue: SQLiteTaskQueue, worker_id: str, concurrency: int, poll: float):
+    running = set()
+
+    async def slot():
+        while True:
+            claimed = await asyncio.to_thread(queue.claim, worker_id, 1)
+            if not claimed:
+                await asyncio.sleep(poll)
+                continue
+            task_id, kind, payload = claimed[0]
+            running.add(task_id)
+            try:
+                result = await execute(kind, payload)
+            except Exception as e:
+                print(f"Task {task_id} ({kind}) failed: {type(e).__name__} - {e}")
+                result = {"error": f"{type(e).__name__}: {e}", "type": type(e).__name__}
+            finally:
+                running.discard(task_id)
+            if not await asyncio.to_thread(queue.complete, task_id, worker_id, result):
+                print(f"Task {task_id} was withdrawn, dropping its result")
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(queue.lease / 3)
+            await asyncio.to_thread(queue.heartbeat, worker_id, list(running))
+
+    await main.browser_pool.start()
+    print(f"Worker {worker_id} polling {queue.path} with {concurrency} slots")
+    tasks = [asyncio.create_task(slot()) for _ in range(concurrency)]
+    tasks.append(asyncio.create_task(heartbeat()))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await main.browser_pool.stop()
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=main.browser_pool.max_pages,
+                        help="tasks run at once (default: BROWSER_POOL_MAX_PAGES)")
+    parser.add_argument("--poll", type=float, default=main.TASK_QUEUE_POLL,
+                        help="seconds between checks of an empty queue")
+    parser.add_argument("--id", default=f"{socket.gethostname()}:{os.getpid()}",
+                        help="name reported for this worker (default: host:pid)")
+    args = parser.parse_args()
+
+    queue = SQLiteTaskQueue(main.TASK_QUEUE_PATH, lease=main.TASK_QUEUE_LEASE)
+    try:
+        asyncio.run(run_worker(queue, args.id, max(1, args.concurrency), args.poll))
+    except KeyboardInterrupt:
+        print(f"Worker {args.id} stopped")
+
+
+if __name__ == "__main__":
+    cli()